@@ -3,4 +3,7 @@ from .router import RouterNode
 from .rag_judge import RagJudge
 from .rag_judge import RagJudgeNode
 from .answer import AnswerNode
-from .web_search import WebSearchNode
\ No newline at end of file
+from .web_search import WebSearchNode
+from .web_compress import WebCompressNode
+from .router_judge import RouteJudgeDecision
+from .router_judge import RouterJudgeNode
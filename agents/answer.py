@@ -1,44 +1,60 @@
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
-from states import AgentState
+from states import AgentState, time_remaining
+from utils.resilience import get_breaker
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 # from messages import LilyMessage  # Using AIMessage instead for PostgreSQL compatibility
-from typing import Literal
+from typing import Literal, Optional
 import pathlib
+import os
 
 class AnswerNode:
     def __init__(
-            self, 
-            model_name: str = "gpt-4.1-mini", 
+            self,
+            model_name: str = "gpt-4.1-mini",
             temperature: float = 0.7,
-            max_tokens: int = 16000
+            max_tokens: int = 16000,
+            prompt_mode: Optional[Literal["inline", "messages"]] = None,
+            tokens_per_second: Optional[float] = None,
+            min_tokens: int = 256,
+            expected_tokens: Optional[int] = None
         ):
         self.answer_llm = ChatOpenAI(model=model_name, temperature=temperature, max_tokens=max_tokens)
+        self.max_tokens = max_tokens
+        # Expected generation speed, used to fit the answer in the time left
+        self.tokens_per_second = tokens_per_second or float(os.getenv("ANSWER_TOKENS_PER_SECOND", 60))
+        self.min_tokens = min_tokens
+        # Length of a normal answer; only when less than this fits in the
+        # time left is the answer capped and asked to be shorter
+        self.expected_tokens = expected_tokens or int(os.getenv("ANSWER_EXPECTED_TOKENS", 800))
+        # "inline" flattens the conversation into a single prompt string.
+        # "messages" keeps the system prompt and prior turns as a stable prefix
+        # so the provider's automatic prompt caching can reuse it across turns.
+        self.prompt_mode = prompt_mode or os.getenv("ANSWER_PROMPT_MODE", "inline")
+
+        ROOT = pathlib.Path(__file__).parents[1]
+        self.rosy_prompt = (ROOT / "prompts" / "rosy.md").read_text(encoding="utf-8")
 
     def _get_context(self, state: AgentState) -> str|None:
         ctx_parts = []
-        
-        if state.get("rag"):
-            ctx_parts.append(f"Retrieved info from RAG:\n{state['rag']}")
-        
+
+        if state.get("rag_docs"):
+            ctx_parts.append(f"Retrieved info from RAG:\n{state['rag_docs']}")
+
         if state.get("web"):
             ctx_parts.append(f"Retrieved info from web:\n{state['web']}")
-        
+
         return "\n\n".join(ctx_parts) if ctx_parts else None
 
-    def __call__(self, state: AgentState) -> AgentState:
-        # query = next((m.content for m in reversed(state["messages"])
-        #               if isinstance(m, HumanMessage)), "")
-        
+    def _inline_messages(self, state: AgentState, context: str|None) -> list:
         conversation = "\n".join([f"{m.type}: {m.content}" for m in state["messages"]])
         # print(f"Conversation:\n{conversation}")
-        context = self._get_context(state)
         prompt = ""
         if context:
             prompt = f"""Please answer the user's latest query in the conversation based on the provided context:
                     Conversation:
                     {conversation}
-                    
+
                     Context:
                     {context}
 
@@ -50,18 +66,80 @@ class AnswerNode:
                     {conversation}
                     """
 
-        ROOT = pathlib.Path(__file__).parents[1]
-        ROSY_PROMPT = (ROOT / "prompts" / "rosy.md").read_text(encoding="utf-8")
-        
-        response = self.answer_llm.invoke([
-            SystemMessage(content=ROSY_PROMPT),
+        return [
+            SystemMessage(content=self.rosy_prompt),
             HumanMessage(content=prompt)
-        ]).content
+        ]
+
+    def _structured_messages(self, state: AgentState, context: str|None) -> list:
+        """Static system prompt, then prior turns, then the volatile context last."""
+        messages = state["messages"]
+        last_human = next((i for i in range(len(messages) - 1, -1, -1)
+                           if isinstance(messages[i], HumanMessage)), None)
+
+        history = []
+        for m in messages[:last_human] if last_human is not None else messages:
+            if isinstance(m, HumanMessage):
+                history.append(HumanMessage(content=m.content))
+            elif isinstance(m, AIMessage):
+                history.append(AIMessage(content=m.content))
+
+        query = messages[last_human].content if last_human is not None else ""
+        if context:
+            latest = f"""{query}
+
+Context:
+{context}
 
+Provide a helpful, accurate, and concise response based on the available information."""
+        else:
+            latest = query
+
+        return [SystemMessage(content=self.rosy_prompt), *history, HumanMessage(content=latest)]
+
+    def _token_limit(self, state: AgentState) -> int|None:
+        """max_tokens that fits the turn's remaining time, or None when a normal answer fits."""
+        # Leave a second for the request round-trip and time to first token
+        affordable = (time_remaining(state) - 1) * self.tokens_per_second
+        if affordable >= min(self.expected_tokens, self.max_tokens):
+            return None
+        return max(int(affordable), self.min_tokens)
+
+    def _report_usage(self, response: AIMessage):
+        usage = getattr(response, "usage_metadata", None) or {}
+        if not usage:
+            return
+        cached = (usage.get("input_token_details") or {}).get("cache_read", 0)
+        print(f"Answer usage: input={usage.get('input_tokens', 0)} "
+              f"cached={cached} output={usage.get('output_tokens', 0)}")
+
+    def __call__(self, state: AgentState) -> AgentState:
+        # query = next((m.content for m in reversed(state["messages"])
+        #               if isinstance(m, HumanMessage)), "")
+
+        context = self._get_context(state)
+        if self.prompt_mode == "messages":
+            prompt_messages = self._structured_messages(state, context)
+        else:
+            prompt_messages = self._inline_messages(state, context)
+
+        # Raises CircuitOpen without calling OpenAI while it is failing
+        breaker = get_breaker("openai")
+        max_tokens = self._token_limit(state)
+        if max_tokens is None:
+            response = breaker.call(self.answer_llm.invoke, prompt_messages)
+        else:
+            # Ask for a shorter answer so it isn't cut off mid-sentence
+            prompt_messages[-1] = HumanMessage(
+                content=f"{prompt_messages[-1].content}\n\nKeep the answer under {int(max_tokens * 0.6)} words."
+            )
+            response = breaker.call(self.answer_llm.invoke, prompt_messages, max_tokens=max_tokens)
+        self._report_usage(response)
+
+        # add_messages appends, so only the new reply needs to be written
         return {
-            **state,
-            "messages": state["messages"] + [AIMessage(content=response)]
+            "messages": [AIMessage(content=response.content)]
         }
-    
+
     def after_web(self, state: AgentState) -> Literal["answer"]:
-        return "answer"
\ No newline at end of file
+        return "answer"
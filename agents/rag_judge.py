@@ -1,10 +1,12 @@
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
-from states import AgentState
+from states import AgentState, time_remaining
 from langchain_core.messages import HumanMessage, SystemMessage
 from tools import PineconeBookRetrieverTool
-from typing import Literal
+from utils.resilience import CircuitOpen, get_breaker, breaker_open
+from typing import Literal, Optional
 import pathlib
+import os
 
 class RagJudge(BaseModel):
     sufficient: bool
@@ -14,8 +16,13 @@ class RagJudgeNode:
     def __init__(
             self, 
             model_name: str = "gpt-4.1-mini", 
-            temperature: float = 0.7
+            temperature: float = 0.7,
+            min_judge_seconds: Optional[float] = None
         ):
+        # Below this much time left in the turn the judge call is skipped and
+        # the retrieved chunks go straight to the answer
+        self.min_judge_seconds = min_judge_seconds if min_judge_seconds is not None \
+            else float(os.getenv("JUDGE_MIN_SECONDS", 12))
         self.judge_llm = ChatOpenAI(model=model_name, temperature=temperature)\
             .with_structured_output(RagJudge)
         self.rag_search = PineconeBookRetrieverTool()
@@ -25,6 +32,21 @@ class RagJudgeNode:
                       if isinstance(m, HumanMessage)), "")
         
         chunks = self.rag_search.invoke({"query": query})
+        # Fallback when the books have nothing (or Pinecone is down) or the
+        # judge fails: search the web, unless Tavily is down too
+        fallback = "answer" if breaker_open("tavily") else "web"
+        if not chunks:
+            return {
+                "rag_docs": "",
+                "route": fallback
+            }
+        if time_remaining(state) < self.min_judge_seconds:
+            print("Deadline near: skipping RAG judge")
+            return {
+                "rag_docs": chunks,
+                "route": "answer"
+            }
+
         _ROOT = pathlib.Path(__file__).parents[1]
         _JUDGE_PROMPT = (_ROOT / "prompts" / "judge.md").read_text(encoding="utf-8")
         judge_messages = [
@@ -36,19 +58,28 @@ class RagJudgeNode:
             """)
         ]
 
-        verdict = self.judge_llm.invoke(judge_messages)
+        try:
+            verdict = get_breaker("openai").call(self.judge_llm.invoke, judge_messages)
+        except CircuitOpen:
+            # The answer would fail too; don't pay for a web search first
+            raise
+        except Exception as e:
+            print(f"Judge Error: {e}")
+            return {
+                "rag_docs": chunks,
+                "route": fallback
+            }
 
         route = ""
         if verdict.sufficient:
             if verdict.use_web:
-                route = "web"
+                route = fallback
             else:
                 route = "answer"
         else:
-            route = "web"
+            route = fallback
 
         return {
-            **state,
             "rag_docs": chunks,
             "route": route
         }
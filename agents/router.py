@@ -3,6 +3,7 @@ from typing import Literal
 from langchain_openai import ChatOpenAI
 from states import AgentState
 from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from utils.resilience import CircuitOpen, get_breaker, breaker_open
 import pathlib
 
 class RouteDecision(BaseModel):
@@ -35,9 +36,28 @@ class RouterNode:
             HumanMessage(content=query)
         ]
 
-        result: RouteDecision = self.router_llm.invoke(messages)
+        # Every route ends in an OpenAI answer, so don't spend retrieval or
+        # web searches on a turn that can't be answered
+        if breaker_open("openai"):
+            raise CircuitOpen("openai")
 
-        out = {"messages": state["messages"], "route": result.route}
+        try:
+            route = get_breaker("openai").call(self.router_llm.invoke, messages).route
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            # Retrieval + answer is the safe default for this assistant
+            print(f"Router Error: {e}")
+            route = "rag"
+
+        # Steer around dependencies whose circuit breaker is open
+        if route == "rag" and breaker_open("pinecone"):
+            route = "web"
+        if route == "web" and breaker_open("tavily"):
+            route = "answer"
+
+        # Only return what changed; messages are already in the checkpoint
+        out = {"route": route}
         # if result.route == "end":
         #     out["messages"] = state["messages"] + [ AIMessage(content=result.reply or "Hello!") ]
 
@@ -0,0 +1,70 @@
+from pydantic import Field
+from langchain_openai import ChatOpenAI
+from states import AgentState
+from langchain_core.messages import HumanMessage, SystemMessage
+from tools import PineconeBookRetrieverTool
+from utils.resilience import CircuitOpen, get_breaker, breaker_open
+from .router import RouteDecision
+from .rag_judge import RagJudge
+from typing import Literal
+import pathlib
+
+class RouteJudgeDecision(RouteDecision, RagJudge):
+    sufficient: bool = Field(description="Only for route == rag: the retrieved passages answer the query")
+    use_web: bool = Field(description="Only for route == rag: a web search is still needed")
+
+class RouterJudgeNode:
+    """Router and RAG judge in one structured-output call.
+
+    Book passages are retrieved before routing, so a single call can both
+    pick the route and judge whether the passages are enough. This saves an
+    LLM round-trip on RAG turns at the cost of a retrieval on every turn.
+    """
+
+    def __init__(
+            self,
+            model_name: str = "gpt-4.1-mini",
+            temperature: float = 0.7
+        ):
+        self.router_judge_llm = ChatOpenAI(model=model_name, temperature=temperature)\
+            .with_structured_output(RouteJudgeDecision)
+        self.rag_search = PineconeBookRetrieverTool()
+
+        ROOT = pathlib.Path(__file__).parents[1]
+        self.prompt = (ROOT / "prompts" / "router_judge.md").read_text(encoding="utf-8")
+
+    def __call__(self, state: AgentState) -> AgentState:
+        query = next((m.content for m in reversed(state["messages"])
+                      if isinstance(m, HumanMessage)), "")
+
+        # Every route ends in an OpenAI answer, so don't spend retrieval or
+        # web searches on a turn that can't be answered
+        if breaker_open("openai"):
+            raise CircuitOpen("openai")
+
+        chunks = self.rag_search.invoke({"query": query})
+        web_or_answer = "answer" if breaker_open("tavily") else "web"
+
+        messages = [
+            SystemMessage(content=self.prompt),
+            HumanMessage(content=f"Query: {query}\n\nRetrieved book passages:\n{chunks or '(none)'}")
+        ]
+        try:
+            decision = get_breaker("openai").call(self.router_judge_llm.invoke, messages)
+        except CircuitOpen:
+            raise
+        except Exception as e:
+            # Answer from the books if we have anything, otherwise search the web
+            print(f"Router/Judge Error: {e}")
+            return {"rag_docs": chunks, "route": "answer" if chunks else web_or_answer}
+
+        if decision.route == "rag":
+            if not chunks or not decision.sufficient or decision.use_web:
+                return {"rag_docs": chunks, "route": web_or_answer}
+            return {"rag_docs": chunks, "route": "answer"}
+        if decision.route == "web":
+            return {"route": web_or_answer}
+        return {"route": "answer"}
+
+    def after_router_judge(self, state: AgentState) -> Literal["answer", "web"]:
+        return state["route"]
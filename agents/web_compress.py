@@ -0,0 +1,155 @@
+from states import AgentState
+from langchain_core.messages import HumanMessage
+from typing import Optional
+import math
+import os
+import re
+
+_WORD = re.compile(r"\w+")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "can", "do", "for",
+    "from", "has", "have", "how", "i", "if", "in", "is", "it", "my", "of", "on",
+    "or", "should", "so", "that", "the", "their", "this", "to", "was", "what",
+    "when", "which", "who", "why", "will", "with", "you", "your",
+}
+
+
+def _terms(text: str) -> list[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS]
+
+
+def _shingles(text: str, size: int = 3) -> set[tuple[str, ...]]:
+    words = _WORD.findall(text.lower())
+    return {tuple(words[i:i + size]) for i in range(max(len(words) - size + 1, 1))}
+
+
+def _token_counter():
+    """Count tokens with tiktoken, falling back to ~4 characters per token.
+
+    The encoding is loaded on first use rather than at startup, because
+    tiktoken downloads it the first time and that fails when offline.
+    """
+    encoding = None
+
+    def count(text: str) -> int:
+        nonlocal encoding
+        if encoding is None:
+            try:
+                import tiktoken
+                encoding = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                print(f"Token counting falls back to estimates: {e}")
+                encoding = False
+        return len(encoding.encode(text)) if encoding else len(text) // 4
+
+    return count
+
+
+def split_passages(text: str, max_chars: int = 600) -> list[str]:
+    """Split on paragraphs, then pack sentences into passages of up to max_chars."""
+    passages = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        current = ""
+        for sentence in re.split(r"(?<=[.!?])\s+", paragraph):
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                passages.append(current)
+                current = sentence
+            else:
+                current = f"{current} {sentence}".strip()
+        if current:
+            passages.append(current)
+    return passages
+
+
+def bm25_scores(query: str, passages: list[str], k1: float = 1.5, b: float = 0.75) -> list[float]:
+    docs = [_terms(p) for p in passages]
+    if not docs:
+        return []
+    avg_len = sum(len(d) for d in docs) / len(docs) or 1.0
+    doc_freq: dict[str, int] = {}
+    for doc in docs:
+        for term in set(doc):
+            doc_freq[term] = doc_freq.get(term, 0) + 1
+
+    scores = []
+    for doc in docs:
+        score = 0.0
+        for term in set(_terms(query)):
+            tf = doc.count(term)
+            if not tf:
+                continue
+            idf = math.log(1 + (len(docs) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * len(doc) / avg_len))
+        scores.append(score)
+    return scores
+
+
+class WebCompressNode:
+    """Shrinks raw web results to the passages most relevant to the query.
+
+    Results are split into passages, scored with BM25 against the latest user
+    message, near-duplicates across sources are dropped, and the best
+    passages are kept until the token budget is spent. Kept passages are
+    grouped back under their source title/URL so the answer can cite them.
+    """
+
+    def __init__(
+            self,
+            token_budget: Optional[int] = None,
+            passage_chars: int = 600,
+            duplicate_threshold: float = 0.6
+        ):
+        self.token_budget = token_budget or int(os.getenv("WEB_TOKEN_BUDGET", 1500))
+        self.passage_chars = passage_chars
+        self.duplicate_threshold = duplicate_threshold
+        self.count_tokens = _token_counter()
+
+    def compress(self, query: str, results: list[dict]) -> str:
+        candidates = []  # (result index, position in result, passage)
+        for r, result in enumerate(results):
+            for position, passage in enumerate(split_passages(result.get("content", ""), self.passage_chars)):
+                candidates.append((r, position, passage))
+        if not candidates:
+            return ""
+
+        scores = bm25_scores(query, [c[2] for c in candidates])
+        ranked = sorted(zip(scores, candidates), key=lambda x: (-x[0], x[1][0], x[1][1]))
+
+        # Passages sharing no query terms are boilerplate unless nothing matched
+        any_match = ranked[0][0] > 0
+        selected, selected_shingles, used = [], [], 0
+        for score, (r, position, passage) in ranked:
+            if any_match and score <= 0:
+                break
+            shingles = _shingles(passage)
+            if any(len(shingles & s) / len(shingles | s) >= self.duplicate_threshold
+                   for s in selected_shingles):
+                continue
+            tokens = self.count_tokens(passage)
+            if used + tokens > self.token_budget:
+                continue
+            selected.append((r, position, passage))
+            selected_shingles.append(shingles)
+            used += tokens
+
+        sections = []
+        for r, result in enumerate(results):
+            passages = [p for (sr, _, p) in sorted(selected) if sr == r]
+            if passages:
+                sections.append(f"Title: {result.get('title', 'No title')}\nURL: {result.get('url', '')}\n"
+                                f"Content: {' ... '.join(passages)}\n")
+        return "\n\n".join(sections)
+
+    def __call__(self, state: AgentState) -> AgentState:
+        query = next((m.content for m in reversed(state["messages"])
+                      if isinstance(m, HumanMessage)), "")
+
+        compressed = self.compress(query, state.get("web_results") or [])
+
+        return {
+            "web": compressed,
+            "route": "answer"
+        }
@@ -1,21 +1,38 @@
 from pydantic import BaseModel
 from langchain_openai import ChatOpenAI
-from states import AgentState
+from states import AgentState, time_remaining
 from langchain_core.messages import HumanMessage
 from tools import WebSearchTool
+from typing import Optional
+import os
 
 class WebSearchNode:
-    def __init__(self):
+    def __init__(self, min_search_seconds: Optional[float] = None):
         self.web_tool = WebSearchTool()
+        # Below this much time left in the turn the search is skipped and the
+        # answer is written from what we already have
+        self.min_search_seconds = min_search_seconds if min_search_seconds is not None \
+            else float(os.getenv("WEB_SEARCH_MIN_SECONDS", 10))
 
     def __call__(self, state: AgentState) -> AgentState:
+        if time_remaining(state) < self.min_search_seconds:
+            print("Deadline near: skipping web search")
+            return {
+                "web_results": [],
+                "route": "answer"
+            }
+
         query = next((m.content for m in reversed(state["messages"])
                       if isinstance(m, HumanMessage)), "")
 
-        search_results = self.web_tool.invoke({"query": query})
+        # Raw results are compressed to a token budget by WebCompressNode
+        try:
+            search_results = self.web_tool.search(query)
+        except Exception as e:
+            print(f"Web Error: {e}")
+            search_results = []
         
         return {
-            **state,
-            "web": search_results,
+            "web_results": search_results,
             "route": "answer"
         }
\ No newline at end of file
@@ -1,17 +1,46 @@
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 import uuid
 import hashlib
 import os
+import asyncio
+import threading
 from typing import Optional, List
 from initialize_agent import Agent
+from states import deadline_in
 from langchain_core.messages import HumanMessage, AIMessage
 import psycopg
 from dotenv import load_dotenv
+from utils.thread_cache import ThreadOwnershipCache
+from utils.migrations import ensure_schema
+from utils.idempotency import IdempotencyStore, IdempotencyKeyReused, IdempotencyInProgress, request_fingerprint
+from utils.job_queue import JobQueue, JobWorkerPool, FINISHED_STATUSES
+from utils.thread_locks import ThreadTurnLocks, TurnLockTimeout
+from utils.profiling import RequestProfiler
+from utils.resilience import CircuitOpen, breaker_stats
 
 load_dotenv(dotenv_path=".env", override=True)
 
+# Thread ownership never changes, so cache it to skip the per-request lookup
+thread_cache = ThreadOwnershipCache(
+    max_size=int(os.getenv("THREAD_CACHE_SIZE", 10000)),
+    negative_ttl=float(os.getenv("THREAD_CACHE_NEGATIVE_TTL", 30)),
+    positive_ttl=float(os.getenv("THREAD_CACHE_POSITIVE_TTL", 60)),
+)
+
+# Latency target for a chat turn; 0 disables deadline-aware degradation
+TURN_BUDGET_SECONDS = float(os.getenv("TURN_BUDGET_SECONDS", 25))
+
+# Per-request sampling profiles, requested with X-Profile-Token or sampled
+profiler = RequestProfiler(
+    output_dir=os.getenv("PROFILE_DIR", "profiles"),
+    admin_token=os.getenv("PROFILE_ADMIN_TOKEN") or None,
+    sample_rate=float(os.getenv("PROFILE_SAMPLE_RATE", 0)),
+    output_format=os.getenv("PROFILE_FORMAT", "speedscope"),
+)
+
 # Pydantic models
 class UserCreate(BaseModel):
     username: str
@@ -42,14 +71,64 @@ class ChatHistory(BaseModel):
     user_id: str
     messages: List[MessageResponse]
 
+class JobStatus(BaseModel):
+    job_id: str
+    status: str
+    response: Optional[MessageResponse] = None
+    error: Optional[str] = None
+
 # Database connection
+# Per-worker shared resources, created once during warm-up
+db_pool = None
+_agent = None
+_agent_lock = threading.Lock()
+warmup_done = threading.Event()
+shutting_down = threading.Event()
+
 def get_db_connection():
     """Get database connection for user management."""
+    if db_pool is not None:
+        # Returns the connection to the pool (committing) when the block exits
+        return db_pool.connection()
     conn_string = os.getenv("SUPABASE_URL")
     if not conn_string:
         raise HTTPException(status_code=500, detail="Database connection not configured")
     return psycopg.connect(conn_string)
 
+# Stored responses for retried send_message calls carrying an Idempotency-Key
+idempotency_store = IdempotencyStore(
+    get_db_connection,
+    ttl=float(os.getenv("IDEMPOTENCY_TTL", 24 * 3600)),
+    wait_timeout=float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", 60)),
+)
+
+# Chat turns submitted with "Prefer: respond-async" are queued here
+job_queue = JobQueue(get_db_connection, lease=float(os.getenv("JOB_LEASE", 600)))
+job_workers = None
+
+# Serializes turns per chat thread so concurrent sends can't fork the checkpoint;
+# "postgres" mode also serializes across worker processes. A database-backed
+# deployment runs several processes (web workers plus `python worker.py`), so
+# that is the default whenever there is a database
+turn_locks = ThreadTurnLocks(
+    mode=os.getenv("TURN_LOCK_MODE") or ("postgres" if os.getenv("SUPABASE_URL") else "local"),
+    conn_string=os.getenv("SUPABASE_URL"),
+    # Each running turn holds a connection: cover the HTTP threadpool (40
+    # threads) plus job worker threads, so unrelated chats never wait
+    pool_size=int(os.getenv("TURN_LOCK_POOL_SIZE") or
+                  40 + max(int(os.getenv("JOB_WORKERS", 0)), int(os.getenv("JOB_WORKER_CONCURRENCY", 4)))),
+    timeout=float(os.getenv("TURN_LOCK_TIMEOUT", 120)),
+)
+
+def get_agent() -> Agent:
+    """Return this worker's compiled agent graph, building it on first use."""
+    global _agent
+    if _agent is None:
+        with _agent_lock:
+            if _agent is None:
+                _agent = Agent()
+    return _agent
+
 def hash_password(password: str) -> str:
     """Hash password using SHA256."""
     return hashlib.sha256(password.encode()).hexdigest()
@@ -58,38 +137,107 @@ def verify_password(password: str, hashed: str) -> bool:
     """Verify password against hash."""
     return hash_password(password) == hashed
 
+def verify_thread_owner(user_id: str, thread_id: str):
+    """Raise 404 unless the thread belongs to the user, consulting the cache first."""
+    owned = thread_cache.get(user_id, thread_id)
+    if owned is None:
+        with get_db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT ct.thread_id FROM chat_threads ct WHERE ct.thread_id = %s AND ct.user_id = %s",
+                    (thread_id, user_id)
+                )
+                owned = cur.fetchone() is not None
+        thread_cache.set(user_id, thread_id, owned)
+    if not owned:
+        raise HTTPException(status_code=404, detail="Chat thread not found")
+
 # Initialize database tables
 def init_db():
-    """Initialize user management tables."""
+    """Bring the database schema up to date (a single query when already at head)."""
     try:
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                # Create lily_users table (avoid conflict with Supabase auth.users)
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS lily_users (
-                        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                        username VARCHAR(50) UNIQUE NOT NULL,
-                        password_hash VARCHAR(64) NOT NULL,
-                        email VARCHAR(100),
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                # Create chat_threads table
-                cur.execute("""
-                    CREATE TABLE IF NOT EXISTS chat_threads (
-                        id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-                        thread_id VARCHAR(100) UNIQUE NOT NULL,
-                        user_id UUID REFERENCES lily_users(id) ON DELETE CASCADE,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                
-                conn.commit()
-                print("Database tables initialized successfully")
+        ensure_schema()
     except Exception as e:
         print(f"Error initializing database: {e}")
 
+def _warm_up_once():
+    """Migrate, open the DB pool and build the graph; raises on failure."""
+    global db_pool
+    conn_string = os.getenv("SUPABASE_URL")
+    if conn_string:
+        # A no-op once it succeeded, so a failed migration at startup is retried here
+        ensure_schema()
+    if conn_string and db_pool is None:
+        from psycopg_pool import ConnectionPool
+        db_pool = ConnectionPool(
+            conn_string,
+            min_size=int(os.getenv("DB_POOL_MIN_SIZE", 1)),
+            max_size=int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            open=True,
+        )
+    if db_pool is not None:
+        # The pool keeps reconnecting in the background; a retry waits again
+        db_pool.wait()
+    return get_agent()
+
+def warm_up(max_attempts: Optional[int] = None):
+    """Open the DB pool, build the graph and ping upstreams before taking traffic.
+
+    Failures are retried with exponential backoff (capped at
+    WARMUP_RETRY_MAX_SECONDS) until warm-up succeeds, `max_attempts` is
+    reached or the app shuts down, so a worker that booted during an outage
+    becomes ready once its dependencies are back.
+    """
+    max_delay = float(os.getenv("WARMUP_RETRY_MAX_SECONDS", 30))
+    delay = 1.0
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            agent = _warm_up_once()
+            break
+        except Exception as e:
+            if max_attempts is not None and attempt >= max_attempts:
+                print(f"Warm-up failed after {attempt} attempt(s), worker will not report ready: {e}")
+                return
+            print(f"Warm-up attempt {attempt} failed, retrying in {delay:.0f}s: {e}")
+            if shutting_down.wait(delay):
+                return
+            delay = min(delay * 2, max_delay)
+
+    if os.getenv("WARMUP_PING", "true").lower() == "true":
+        # Establish upstream connections with a trivial embedding + retrieval
+        # and a one-token completion so the first user request isn't cold
+        try:
+            agent.rag_search.invoke({"query": "ping"})
+            agent.answer.answer_llm.invoke("ping", max_tokens=1)
+        except Exception as e:
+            print(f"Warm-up ping failed: {e}")
+
+    warmup_done.set()
+    print("Warm-up complete")
+
+def start_job_workers(concurrency: int) -> Optional[JobWorkerPool]:
+    """Run queued chat turns on background threads of this process."""
+    global job_workers
+    if concurrency <= 0 or job_workers is not None:
+        return job_workers
+    job_workers = JobWorkerPool(
+        job_queue,
+        run_job,
+        concurrency=concurrency,
+        poll_interval=float(os.getenv("JOB_POLL_INTERVAL", 0.5)),
+    )
+    job_workers.start()
+    return job_workers
+
+def warm_up_and_start_workers():
+    warm_up()
+    # Jobs are handled by separate `python worker.py` processes by default; set
+    # JOB_WORKERS to also run them inside web processes (e.g. without a worker)
+    if warmup_done.is_set():
+        start_job_workers(int(os.getenv("JOB_WORKERS", 0)))
+
 # Initialize DB on startup
 from contextlib import asynccontextmanager
 
@@ -97,8 +245,20 @@ from contextlib import asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     init_db()
+    # Warm up in the background so liveness checks answer immediately while
+    # /ready stays 503 until this worker can serve chat traffic
+    warmup_task = asyncio.create_task(asyncio.to_thread(warm_up_and_start_workers))
     yield
-    # Shutdown (if needed)
+    # Shutdown
+    shutting_down.set()
+    warmup_task.cancel()
+    if job_workers is not None:
+        job_workers.stop(timeout=5)
+    turn_locks.close()
+    if _agent is not None:
+        _agent.close()
+    if db_pool is not None:
+        db_pool.close()
 
 app = FastAPI(
     title="Rosi Chat API", 
@@ -116,6 +276,10 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Only installed when profiling is configured, so it costs nothing otherwise
+if profiler.enabled:
+    app.middleware("http")(profiler.middleware)
+
 # User Management Endpoints
 @app.post("/users/register", response_model=dict)
 def register_user(user: UserCreate):
@@ -181,6 +345,7 @@ def create_chat(chat: ChatCreate):
                     (thread_id, chat.user_id)
                 )
                 conn.commit()
+                thread_cache.set(chat.user_id, thread_id, True)
                 
                 return ChatResponse(thread_id=thread_id, user_id=chat.user_id)
                 
@@ -188,22 +353,16 @@ def create_chat(chat: ChatCreate):
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 @app.get("/chat/{user_id}/{thread_id}", response_model=ChatHistory)
+@profiler.profile
 def get_chat(user_id: str, thread_id: str):
     """Load existing chat conversation."""
     try:
         # Verify thread belongs to user
-        with get_db_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute(
-                    "SELECT ct.thread_id FROM chat_threads ct WHERE ct.thread_id = %s AND ct.user_id = %s",
-                    (thread_id, user_id)
-                )
-                if not cur.fetchone():
-                    raise HTTPException(status_code=404, detail="Chat thread not found")
+        verify_thread_owner(user_id, thread_id)
         
         # Get conversation from checkpointer
         config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
-        agent = Agent(config=config)
+        agent = get_agent()
         
         # Try to get existing state
         try:
@@ -230,40 +389,153 @@ def get_chat(user_id: str, thread_id: str):
     except psycopg.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
-@app.post("/chat/{user_id}/{thread_id}/message", response_model=MessageResponse)
-def send_message(user_id: str, thread_id: str, message: MessageSend):
+def run_turn(user_id: str, thread_id: str, text: str) -> MessageResponse:
+    """Run one chat turn through the agent and return the AI reply."""
+    # Process message with agent
+    config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
+    agent = get_agent()
+    
+    # Create state with the new message; nodes trim optional work to finish
+    # within the turn budget (time spent queued as a job doesn't count)
+    state = {"messages": [HumanMessage(content=text)]}
+    if TURN_BUDGET_SECONDS > 0:
+        state["deadline"] = deadline_in(TURN_BUDGET_SECONDS)
+    
+    # Get response from agent, one turn per thread at a time
+    try:
+        with turn_locks.hold(thread_id):
+            response = agent(state, config)
+    except TurnLockTimeout:
+        raise HTTPException(status_code=409, detail="Another message in this chat is still being processed")
+    except CircuitOpen:
+        # The answer model is failing; fail fast instead of waiting on timeouts
+        raise HTTPException(status_code=503, detail="The assistant is temporarily unavailable, please try again shortly",
+                            headers={"Retry-After": os.getenv("BREAKER_RESET_SECONDS", "30")})
+    
+    # Return the latest AI message
+    ai_messages = [m for m in response["messages"] if m.type == "ai"]
+    if not ai_messages:
+        raise HTTPException(status_code=500, detail="No response generated")
+    
+    last_message = ai_messages[-1]
+    return MessageResponse(
+        type="ai",
+        content=last_message.content
+    )
+
+def run_job(job: dict) -> dict:
+    """Job worker handler: run a queued turn and return the stored response."""
+    return run_turn(job["user_id"], job["thread_id"], job["message"]).model_dump()
+
+def job_accepted(user_id: str, thread_id: str, job_id: str) -> JSONResponse:
+    status_url = f"/chat/{user_id}/{thread_id}/jobs/{job_id}"
+    return JSONResponse(
+        status_code=202,
+        content={"job_id": job_id, "status": "queued", "status_url": status_url},
+        headers={"Location": status_url},
+    )
+
+@app.post(
+    "/chat/{user_id}/{thread_id}/message",
+    response_model=MessageResponse,
+    responses={202: {"description": "Turn queued (Prefer: respond-async)"}},
+)
+@profiler.profile
+def send_message(
+    user_id: str,
+    thread_id: str,
+    message: MessageSend,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    prefer: Optional[str] = Header(None),
+):
     """Send a message to a chat thread."""
     try:
         # Verify thread belongs to user
+        verify_thread_owner(user_id, thread_id)
+        
+        # With "Prefer: respond-async" the turn is queued and a job id returned
+        # immediately, so long turns can't hit the load balancer timeout
+        respond_async = prefer is not None and "respond-async" in prefer.lower()
+        def execute() -> dict:
+            if respond_async:
+                return {"job_id": job_queue.enqueue(user_id, thread_id, message.message)}
+            return run_turn(user_id, thread_id, message.message).model_dump()
+        
+        if not idempotency_key:
+            result = execute()
+            if respond_async:
+                return job_accepted(user_id, thread_id, result["job_id"])
+            return MessageResponse(**result)
+        
+        # A retry of a finished request gets the stored answer; a retry racing
+        # the original waits for it instead of running the graph again
+        request_hash = request_fingerprint(thread_id, message.message, "async" if respond_async else "sync")
+        try:
+            stored = idempotency_store.begin(user_id, idempotency_key, thread_id, request_hash)
+        except IdempotencyKeyReused:
+            raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+        except IdempotencyInProgress:
+            raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress")
+        if stored is None:
+            try:
+                stored = execute()
+            except BaseException:
+                idempotency_store.release(user_id, idempotency_key)
+                raise
+            idempotency_store.complete(user_id, idempotency_key, stored)
+        
+        if "job_id" in stored:
+            return job_accepted(user_id, thread_id, stored["job_id"])
+        return MessageResponse(**stored)
+        
+    except psycopg.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.get("/chat/{user_id}/{thread_id}/jobs/{job_id}", response_model=JobStatus)
+async def get_job(user_id: str, thread_id: str, job_id: str, wait: float = 0):
+    """Get the result of a queued turn, long-polling up to `wait` seconds for it to finish."""
+    try:
+        uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(max(wait, 0), float(os.getenv("JOB_MAX_WAIT", 25)))
+    poll_interval = float(os.getenv("JOB_POLL_INTERVAL", 0.5))
+    try:
+        while True:
+            # Poll off the event loop so waiting clients don't hold HTTP worker threads
+            job = await asyncio.to_thread(job_queue.get, job_id, user_id, thread_id)
+            if job is None:
+                raise HTTPException(status_code=404, detail="Job not found")
+            if job["status"] in FINISHED_STATUSES or loop.time() >= deadline:
+                return JobStatus(**job)
+            await asyncio.sleep(poll_interval)
+    
+    except psycopg.Error as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
+
+@app.delete("/chat/{user_id}/{thread_id}", response_model=dict)
+@profiler.profile
+def delete_chat(user_id: str, thread_id: str):
+    """Delete a chat thread owned by the user."""
+    try:
         with get_db_connection() as conn:
             with conn.cursor() as cur:
                 cur.execute(
-                    "SELECT ct.thread_id FROM chat_threads ct WHERE ct.thread_id = %s AND ct.user_id = %s",
+                    "DELETE FROM chat_threads WHERE thread_id = %s AND user_id = %s",
                     (thread_id, user_id)
                 )
-                if not cur.fetchone():
-                    raise HTTPException(status_code=404, detail="Chat thread not found")
-        
-        # Process message with agent
-        config = {"configurable": {"thread_id": thread_id, "user_id": user_id}}
-        agent = Agent(config=config)
-        
-        # Create state with the new message
-        state = {"messages": [HumanMessage(content=message.message)]}
-        
-        # Get response from agent
-        response = agent(state)
+                deleted = cur.rowcount
+                conn.commit()
+        thread_cache.invalidate(thread_id)
+        if not deleted:
+            raise HTTPException(status_code=404, detail="Chat thread not found")
         
-        # Return the latest AI message
-        ai_messages = [m for m in response["messages"] if m.type == "ai"]
-        if not ai_messages:
-            raise HTTPException(status_code=500, detail="No response generated")
+        # Remove the conversation itself, not just the ownership record
+        get_agent().agent.checkpointer.delete_thread(thread_id)
         
-        last_message = ai_messages[-1]
-        return MessageResponse(
-            type="ai",
-            content=last_message.content
-        )
+        return {"thread_id": thread_id, "user_id": user_id, "message": "Chat deleted successfully"}
         
     except psycopg.Error as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -274,8 +546,30 @@ def health_check():
     """Health check endpoint."""
     return {"status": "healthy", "service": "Rosi Chat API"}
 
+# Runtime metrics for this worker process
+@app.get("/metrics")
+def metrics():
+    """Turn lock wait times, cache and breaker states for this worker."""
+    checkpointer = _agent.agent.checkpointer if _agent is not None else None
+    return {
+        "turn_locks": turn_locks.stats(),
+        "thread_cache": thread_cache.stats(),
+        "circuit_breakers": breaker_stats(),
+        # In-memory checkpointer only: threads held in RAM vs spilled to disk
+        "checkpointer": checkpointer.stats() if hasattr(checkpointer, "stats") else None,
+    }
+
+# Readiness endpoint for the router: only ready once warm-up has finished
+@app.get("/ready")
+def readiness_check():
+    """Readiness check endpoint."""
+    if not warmup_done.is_set():
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready", "service": "Rosi Chat API"}
+
 # Get user's chat threads
 @app.get("/users/{user_id}/chats")
+@profiler.profile
 def get_user_chats(user_id: str):
     """Get all chat threads for a user."""
     try:
@@ -0,0 +1,2 @@
+from .serde import CompressedSerializer
+from .bounded_memory import BoundedMemorySaver
@@ -0,0 +1,271 @@
+import asyncio
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from collections.abc import AsyncIterator, Iterator, Sequence
+from typing import Any, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+)
+from langgraph.checkpoint.memory import MemorySaver
+
+
+def _thread_config(thread_id: str, checkpoint_ns: str = "", checkpoint_id: Optional[str] = None) -> RunnableConfig:
+    configurable = {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns}
+    if checkpoint_id is not None:
+        configurable["checkpoint_id"] = checkpoint_id
+    return {"configurable": configurable}
+
+
+def _saver_bytes(saver: MemorySaver) -> int:
+    """Serialized size of everything a MemorySaver holds."""
+    total = 0
+    for namespaces in saver.storage.values():
+        for checkpoints in namespaces.values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                total += len(checkpoint[1]) + len(metadata[1])
+    total += sum(len(blob[1]) for blob in saver.blobs.values())
+    total += sum(len(write[2][1]) for writes in saver.writes.values() for write in writes.values())
+    return total
+
+
+def _copy_thread(source: BaseCheckpointSaver, target: BaseCheckpointSaver, thread_id: str):
+    """Copy a thread's checkpoints and pending writes, oldest first, via the public saver API."""
+    for item in reversed(list(source.list(_thread_config(thread_id)))):
+        configurable = item.config["configurable"]
+        parent = (item.parent_config or {}).get("configurable", {}).get("checkpoint_id")
+        target.put(
+            _thread_config(thread_id, configurable.get("checkpoint_ns", ""), parent),
+            item.checkpoint,
+            item.metadata,
+            item.checkpoint["channel_versions"],
+        )
+        by_task: dict[str, list[tuple[str, Any]]] = {}
+        for task_id, channel, value in item.pending_writes or []:
+            by_task.setdefault(task_id, []).append((channel, value))
+        for task_id, writes in by_task.items():
+            target.put_writes(item.config, writes, task_id)
+
+
+class BoundedMemorySaver(BaseCheckpointSaver[str]):
+    """In-memory checkpointer that keeps only recently active threads in RAM.
+
+    Each thread lives in its own MemorySaver, ordered by last use. When more
+    than `max_threads` threads or `max_bytes` of serialized checkpoints are
+    held, the least recently used threads are moved to a local SQLite file
+    and loaded back the next time they are read or written.
+
+    The SQLite file is scratch space for this process: its name always ends
+    in the process id (so workers sharing `spill_path` never touch each
+    other's file), it is cleared when first opened and removed on `close()`,
+    so, like MemorySaver, history does not survive a restart.
+    """
+
+    def __init__(
+            self,
+            max_threads: int = 1000,
+            max_bytes: int = 256 * 1024 * 1024,
+            spill_path: Optional[str] = None,
+            *,
+            serde=None
+        ):
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.spill_path_base = spill_path or os.path.join(tempfile.gettempdir(), "checkpoints-spill.sqlite")
+        self.spill_path = None
+        self._threads: "OrderedDict[str, MemorySaver]" = OrderedDict()
+        self._sizes: dict[str, int] = {}
+        self._spilled: set[str] = set()
+        self._spill = None
+        self._spill_conn = None
+        self._lock = threading.RLock()
+        self.evictions = 0
+        self.reloads = 0
+
+    def _spill_saver(self):
+        if self._spill is None:
+            import sqlite3
+            from langgraph.checkpoint.sqlite import SqliteSaver
+            # Resolved on first spill, in the process that actually uses it
+            root, ext = os.path.splitext(self.spill_path_base)
+            self.spill_path = f"{root}-{os.getpid()}{ext or '.sqlite'}"
+            if os.path.exists(self.spill_path):
+                os.remove(self.spill_path)
+            # SqliteSaver serializes access with its own lock
+            self._spill_conn = sqlite3.connect(self.spill_path, check_same_thread=False)
+            self._spill = SqliteSaver(self._spill_conn, serde=self.serde)
+            self._spill.setup()
+        return self._spill
+
+    def _saver(self, thread_id: str, create: bool) -> Optional[MemorySaver]:
+        """The thread's in-memory saver, reloading it from SQLite if it was evicted."""
+        saver = self._threads.get(thread_id)
+        if saver is not None:
+            self._threads.move_to_end(thread_id)
+            return saver
+        if thread_id not in self._spilled and not create:
+            return None
+
+        saver = MemorySaver(serde=self.serde)
+        if thread_id in self._spilled:
+            _copy_thread(self._spill, saver, thread_id)
+            self._spill.delete_thread(thread_id)
+            self._spilled.discard(thread_id)
+            self.reloads += 1
+        self._threads[thread_id] = saver
+        self._sizes[thread_id] = _saver_bytes(saver)
+        self._evict(keep=thread_id)
+        return saver
+
+    def _evict(self, keep: str):
+        """Spill least recently used threads until within limits (never `keep`)."""
+        while len(self._threads) > 1 and (
+                len(self._threads) > self.max_threads or sum(self._sizes.values()) > self.max_bytes):
+            thread_id = next(iter(self._threads))
+            if thread_id == keep:
+                self._threads.move_to_end(thread_id)
+                thread_id = next(iter(self._threads))
+            saver = self._threads.pop(thread_id)
+            self._sizes.pop(thread_id, None)
+            self.evictions += 1
+            try:
+                _copy_thread(saver, self._spill_saver(), thread_id)
+                self._spilled.add(thread_id)
+            except ImportError:
+                print(f"langgraph-checkpoint-sqlite is not installed; dropped checkpoints of thread {thread_id}")
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            saver = self._saver(config["configurable"]["thread_id"], create=False)
+            return saver.get_tuple(config) if saver is not None else None
+
+    def list(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None
+        ) -> Iterator[CheckpointTuple]:
+        # Collected under the lock so eviction can't interleave with iteration
+        with self._lock:
+            if config is not None:
+                saver = self._saver(config["configurable"]["thread_id"], create=False)
+                sources = [saver] if saver is not None else []
+            else:
+                # Listing every thread reads spilled threads in place rather than reloading them
+                sources = list(self._threads.values()) + ([self._spill] if self._spilled else [])
+            items = []
+            for source in sources:
+                remaining = None if limit is None else limit - len(items)
+                if remaining is not None and remaining <= 0:
+                    break
+                items.extend(source.list(config, filter=filter, before=before, limit=remaining))
+        yield from items
+
+    def put(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions
+        ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            saver = self._saver(thread_id, create=True)
+            result = saver.put(config, checkpoint, metadata, new_versions)
+            self._sizes[thread_id] = _saver_bytes(saver)
+            self._evict(keep=thread_id)
+            return result
+
+    def put_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple[str, Any]],
+            task_id: str,
+            task_path: str = ""
+        ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            saver = self._saver(thread_id, create=True)
+            saver.put_writes(config, writes, task_id, task_path)
+            self._sizes[thread_id] = _saver_bytes(saver)
+            self._evict(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._threads.pop(thread_id, None)
+            self._sizes.pop(thread_id, None)
+            if thread_id in self._spilled:
+                self._spill.delete_thread(thread_id)
+                self._spilled.discard(thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        # Same version scheme as the MemorySaver (and SqliteSaver) that store the data
+        return MemorySaver.get_next_version(self, current, channel)
+
+    # Spilling and reloading touch SQLite, so async callers run off the event loop
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+            self,
+            config: Optional[RunnableConfig],
+            *,
+            filter: Optional[dict[str, Any]] = None,
+            before: Optional[RunnableConfig] = None,
+            limit: Optional[int] = None
+        ) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(
+            self,
+            config: RunnableConfig,
+            checkpoint: Checkpoint,
+            metadata: CheckpointMetadata,
+            new_versions: ChannelVersions
+        ) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+            self,
+            config: RunnableConfig,
+            writes: Sequence[tuple[str, Any]],
+            task_id: str,
+            task_path: str = ""
+        ) -> None:
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "threads_in_memory": len(self._threads),
+                "bytes_in_memory": sum(self._sizes.values()),
+                "threads_spilled": len(self._spilled),
+                "evictions": self.evictions,
+                "reloads": self.reloads,
+            }
+
+    def close(self):
+        with self._lock:
+            if self._spill_conn is not None:
+                self._spill_conn.close()
+                self._spill = self._spill_conn = None
+                self._spilled.clear()
+                if os.path.exists(self.spill_path):
+                    os.remove(self.spill_path)
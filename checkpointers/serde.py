@@ -0,0 +1,50 @@
+import threading
+from typing import Any
+
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+try:
+    import zstandard
+except ImportError:  # compression is optional; payloads are stored uncompressed
+    zstandard = None
+
+ZSTD_PREFIX = "zstd+"
+
+
+class CompressedSerializer(JsonPlusSerializer):
+    """Checkpoint serde: msgpack encoding, zstd-compressed above a size threshold.
+
+    Compressed payloads are tagged by prefixing their type (e.g.
+    "zstd+msgpack"), so rows written by the default serializer are still read
+    unchanged. Rows written by this serializer can't be read by the default
+    one, so only enable it once every worker runs this code.
+    """
+
+    def __init__(self, threshold: int = 1024, level: int = 3, **kwargs):
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.level = level
+        # zstd (de)compressor objects must not be shared between threads
+        self._local = threading.local()
+
+    def _compressor(self):
+        if not hasattr(self._local, "compressor"):
+            self._local.compressor = zstandard.ZstdCompressor(level=self.level)
+            self._local.decompressor = zstandard.ZstdDecompressor()
+        return self._local.compressor, self._local.decompressor
+
+    def dumps_typed(self, obj: Any) -> tuple[str, bytes]:
+        type_, data = super().dumps_typed(obj)
+        if zstandard is None or len(data) < self.threshold:
+            return type_, data
+        compressor, _ = self._compressor()
+        return f"{ZSTD_PREFIX}{type_}", compressor.compress(data)
+
+    def loads_typed(self, data: tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.startswith(ZSTD_PREFIX):
+            if zstandard is None:
+                raise RuntimeError("Checkpoint is zstd-compressed but the zstandard package is not installed")
+            _, decompressor = self._compressor()
+            return super().loads_typed((type_[len(ZSTD_PREFIX):], decompressor.decompress(payload)))
+        return super().loads_typed(data)
@@ -0,0 +1,5 @@
+from .chunking import CHUNKER_VERSION, chunk_file, chunker_fingerprint, iter_source_files
+from .embedding import BatchEmbedder
+from .manifest import IndexManifest
+from .sinks import PineconeSink, ChromaSink, default_manifest_path
+from .pipeline import run_ingestion
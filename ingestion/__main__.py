@@ -0,0 +1,98 @@
+"""Build the book index from PDFs/markdown.
+
+Re-running the command is incremental: only chunks whose content hash is
+not in the index manifest are embedded, and chunks that no longer exist are
+deleted. Pass the whole corpus every time (or use --keep-missing).
+
+A Pinecone manifest is a local file, so syncing to Pinecone without one is
+refused (it would re-embed everything and leave stale vectors behind) unless
+--rebuild is passed for a first build.
+
+Usage:
+    python -m ingestion books/ --target pinecone --dry-run
+    python -m ingestion books/ --target pinecone --rebuild   # first build
+    python -m ingestion books/ --target pinecone
+    python -m ingestion books/ notes.md --target chroma --workers 8 --embed-concurrency 8
+"""
+
+import argparse
+import os
+from dotenv import load_dotenv
+
+from . import (
+    BatchEmbedder, ChromaSink, IndexManifest, PineconeSink,
+    chunker_fingerprint, default_manifest_path, run_ingestion,
+)
+
+load_dotenv(dotenv_path=".env", override=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+", help="Files or directories to ingest")
+    parser.add_argument("--target", choices=["pinecone", "chroma"], default="pinecone")
+    parser.add_argument("--index", default=None, help="Pinecone index (default: INDEX_NAME)")
+    parser.add_argument("--namespace", default=None, help="Pinecone namespace")
+    parser.add_argument("--collection", default=None, help="Chroma collection (default: COLLECTION_NAME)")
+    parser.add_argument("--persist-dir", default=None, help="Chroma directory (default: PERSIST_DIR)")
+    parser.add_argument("--embedding-model", default=None, help="Embedding model (default: EMBEDDING_MODEL)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Chunking processes")
+    parser.add_argument("--embed-batch-size", type=int, default=256, help="Texts per embedding request")
+    parser.add_argument("--embed-concurrency", type=int, default=4, help="Embedding requests in flight")
+    parser.add_argument("--upsert-batch-size", type=int, default=100, help="Vectors per upsert request")
+    parser.add_argument("--manifest", default=None, help="Chunk hash manifest (default: in PERSIST_DIR for Chroma, .ingest/ for Pinecone)")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be embedded/deleted and exit")
+    parser.add_argument("--keep-missing", action="store_true", help="Don't delete chunks of files not passed in")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Allow a Pinecone sync without a manifest (embeds everything, deletes nothing)")
+    args = parser.parse_args()
+
+    if args.target == "pinecone":
+        name = args.index or os.getenv("INDEX_NAME")
+        manifest_path = args.manifest or default_manifest_path("pinecone", name, namespace=args.namespace)
+    else:
+        name = args.collection or os.getenv("COLLECTION_NAME")
+        persist_dir = args.persist_dir or os.getenv("PERSIST_DIR")
+        manifest_path = args.manifest or default_manifest_path("chroma", name, persist_dir)
+    if args.target == "pinecone" and not os.path.exists(manifest_path):
+        if not args.dry_run and not args.rebuild:
+            parser.error(f"no manifest at {manifest_path}; without it every chunk would be re-embedded and stale "
+                         "vectors never deleted. Copy the manifest from where the index was built (or pass "
+                         "--manifest), or pass --rebuild for a first build")
+        print(f"⚠️  No manifest at {manifest_path}: every chunk is treated as new and nothing is deleted")
+    manifest = IndexManifest(manifest_path, chunker_fingerprint(args.chunk_size, args.chunk_overlap))
+
+    sink = embedder = None
+    if not args.dry_run:
+        if args.target == "pinecone":
+            sink = PineconeSink(index_name=name, namespace=args.namespace)
+        else:
+            sink = ChromaSink(collection_name=name, persist_dir=persist_dir)
+        embedder = BatchEmbedder(model=args.embedding_model)
+
+    print(f"🔄 {'Planning' if args.dry_run else 'Syncing'} {args.target} '{name}' (manifest: {manifest_path})")
+    try:
+        stats = run_ingestion(
+            args.paths,
+            sink,
+            embedder,
+            chunk_size=args.chunk_size,
+            chunk_overlap=args.chunk_overlap,
+            workers=args.workers,
+            embed_batch_size=args.embed_batch_size,
+            embed_concurrency=args.embed_concurrency,
+            upsert_batch_size=args.upsert_batch_size,
+            manifest=manifest,
+            dry_run=args.dry_run,
+            delete_missing=not args.keep_missing,
+        )
+    except KeyboardInterrupt:
+        print(f"⏸️  Interrupted; re-run the same command to resume (progress saved to {manifest_path})")
+        raise SystemExit(130)
+    print(f"📋 {stats.dry_run_summary()}" if args.dry_run else f"✅ {stats.summary()}")
+
+
+if __name__ == "__main__":
+    main()
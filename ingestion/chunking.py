@@ -0,0 +1,65 @@
+import hashlib
+import pathlib
+from typing import Iterable, Iterator
+
+SUPPORTED_SUFFIXES = {".pdf", ".md", ".markdown", ".txt"}
+
+# Bump whenever loading or splitting changes in a way that alters chunk text,
+# so the next re-index replaces every chunk
+CHUNKER_VERSION = "1"
+
+
+def chunker_fingerprint(chunk_size: int, chunk_overlap: int) -> str:
+    return f"v{CHUNKER_VERSION}:{chunk_size}:{chunk_overlap}"
+
+
+def iter_source_files(paths: Iterable[str]) -> Iterator[tuple[pathlib.Path, str]]:
+    """Yield (path, source) for supported files in a stable order.
+
+    `source` is relative to the directory it was found in, so chunk ids don't
+    depend on where the CLI is run from.
+    """
+    for path in map(pathlib.Path, paths):
+        if path.is_dir():
+            for child in sorted(path.rglob("*")):
+                if child.is_file() and child.suffix.lower() in SUPPORTED_SUFFIXES:
+                    yield child, child.relative_to(path).as_posix()
+        elif path.is_file() and path.suffix.lower() in SUPPORTED_SUFFIXES:
+            yield path, path.name
+
+
+def load_pages(path: pathlib.Path) -> list[tuple[int, str]]:
+    """Return (page_number, text) pairs; markdown/text files are a single page."""
+    if path.suffix.lower() == ".pdf":
+        from pypdf import PdfReader
+        reader = PdfReader(str(path))
+        return [(i + 1, page.extract_text() or "") for i, page in enumerate(reader.pages)]
+    return [(1, path.read_text(encoding="utf-8", errors="ignore"))]
+
+
+def chunk_id(chunker: str, source: str, text: str) -> str:
+    """Content hash identifying a chunk; unchanged text keeps its id across runs."""
+    return hashlib.sha256(f"{chunker}\0{source}\0{text}".encode("utf-8")).hexdigest()[:32]
+
+
+def chunk_file(path: str, source: str, chunk_size: int, chunk_overlap: int) -> list[dict]:
+    """Load and split one file. Runs in a worker process, so it must stay picklable."""
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    chunker = chunker_fingerprint(chunk_size, chunk_overlap)
+    chunks = []
+    seen = set()
+    for page, text in load_pages(pathlib.Path(path)):
+        for piece in splitter.split_text(text):
+            cid = chunk_id(chunker, source, piece)
+            # Identical text within a file (repeated headers etc.) is indexed once
+            if not piece.strip() or cid in seen:
+                continue
+            seen.add(cid)
+            chunks.append({
+                "id": cid,
+                "text": piece,
+                "metadata": {"source": source, "page": page, "chunk": len(chunks)},
+            })
+    return chunks
@@ -0,0 +1,50 @@
+import os
+import random
+import time
+from typing import Optional
+
+# Errors worth retrying: rate limits, timeouts, dropped connections and 5xx
+_RETRYABLE_ERRORS = {"RateLimitError", "APITimeoutError", "APIConnectionError", "InternalServerError"}
+
+
+class BatchEmbedder:
+    """Embeds batches of texts with OpenAI, backing off on rate limits."""
+
+    def __init__(
+            self,
+            model: Optional[str] = None,
+            max_retries: int = 8,
+            base_delay: float = 1.0,
+            max_delay: float = 60.0
+        ):
+        from openai import OpenAI
+
+        self.model = model or os.getenv("EMBEDDING_MODEL")
+        # Retries are handled here so they can honour Retry-After across threads
+        self.client = OpenAI(max_retries=0)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(float(retry_after), self.max_delay)
+            except ValueError:
+                pass
+        # Exponential backoff with full jitter so concurrent batches spread out
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def embed(self, texts: list[str]) -> list[list[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(model=self.model, input=texts)
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except Exception as e:
+                if type(e).__name__ not in _RETRYABLE_ERRORS or attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                time.sleep(self._retry_delay(e, attempt))
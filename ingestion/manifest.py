@@ -0,0 +1,77 @@
+import json
+import os
+import pathlib
+import time
+from typing import Optional
+
+
+class IndexManifest:
+    """Content hashes of every chunk in an index, kept alongside it.
+
+    `chunks` maps chunk id (a hash of the chunker version/settings, source and
+    chunk text) to its source file, so a re-index only embeds ids that are not
+    in the manifest and deletes ids that no longer come out of the chunker.
+    `sources` maps a file to the fingerprint it had when all of its chunks
+    were upserted, which lets unchanged files skip chunking entirely.
+
+    The manifest is saved as chunks are upserted, so it doubles as the resume
+    checkpoint for an interrupted run.
+    """
+
+    def __init__(self, path: Optional[str], chunker: str, save_every: float = 5.0):
+        self.path = pathlib.Path(path) if path else None
+        self.chunker = chunker
+        self.save_every = save_every
+        self.chunks: dict[str, str] = {}
+        self.sources: dict[str, str] = {}
+        self._last_save = time.monotonic()
+
+        if self.path and self.path.exists():
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+            self.chunks = data.get("chunks", {})
+            # Source fingerprints are only valid for the chunker that produced them
+            if data.get("chunker") == chunker:
+                self.sources = data.get("sources", {})
+
+    def source_unchanged(self, source: str, fingerprint: str) -> bool:
+        return self.sources.get(source) == fingerprint
+
+    def ids_by_source(self) -> dict[str, list[str]]:
+        by_source: dict[str, list[str]] = {}
+        for chunk_id, source in self.chunks.items():
+            by_source.setdefault(source, []).append(chunk_id)
+        return by_source
+
+    def add_chunks(self, chunks: list[dict]):
+        for chunk in chunks:
+            self.chunks[chunk["id"]] = chunk["metadata"]["source"]
+        self._maybe_save()
+
+    def remove_chunks(self, ids: list[str]):
+        for chunk_id in ids:
+            self.chunks.pop(chunk_id, None)
+        self._maybe_save()
+
+    def mark_source(self, source: str, fingerprint: str):
+        self.sources[source] = fingerprint
+        self._maybe_save()
+
+    def forget_sources(self, keep: set[str]):
+        for source in set(self.sources) - keep:
+            del self.sources[source]
+
+    def _maybe_save(self):
+        if time.monotonic() - self._last_save >= self.save_every:
+            self.save()
+
+    def save(self):
+        self._last_save = time.monotonic()
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"chunker": self.chunker, "sources": self.sources, "chunks": self.chunks}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, self.path)
@@ -0,0 +1,191 @@
+import os
+import pathlib
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Iterable, Optional
+
+from .chunking import chunk_file, chunker_fingerprint, iter_source_files
+from .manifest import IndexManifest
+
+
+class IngestStats:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.files = 0
+        self.skipped_files = 0
+        self.chunks = 0
+        self.new_chunks = 0
+        self.unchanged_chunks = 0
+        self.deleted_chunks = 0
+        self.estimated_tokens = 0
+        self.embed_batches = 0
+
+    @property
+    def chunks_per_sec(self) -> float:
+        return self.chunks / max(time.monotonic() - self.started, 1e-9)
+
+    def summary(self) -> str:
+        return (f"{self.files} file(s) chunked, {self.skipped_files} unchanged file(s) skipped; "
+                f"{self.new_chunks} new/changed chunks, {self.unchanged_chunks} unchanged, "
+                f"{self.deleted_chunks} deleted; {self.chunks} chunks upserted in "
+                f"{time.monotonic() - self.started:.1f}s ({self.chunks_per_sec:.1f} chunks/sec)")
+
+    def dry_run_summary(self) -> str:
+        return (f"{self.new_chunks} new/changed chunks would be embedded "
+                f"(~{self.estimated_tokens} tokens), {self.deleted_chunks} would be deleted, "
+                f"{self.unchanged_chunks} unchanged ({self.files} file(s) chunked, "
+                f"{self.skipped_files} unchanged file(s) skipped)")
+
+
+def _file_fingerprint(path: pathlib.Path) -> str:
+    stat = path.stat()
+    return f"{stat.st_size}:{int(stat.st_mtime)}"
+
+
+def _token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("cl100k_base")
+        return lambda text: len(encoding.encode(text))
+    except Exception:
+        # Not installed, or the encoding can't be downloaded (offline)
+        return lambda text: len(text) // 4
+
+
+def run_ingestion(
+        paths: Iterable[str],
+        sink,
+        embedder,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        workers: Optional[int] = None,
+        embed_batch_size: int = 256,
+        embed_concurrency: int = 4,
+        upsert_batch_size: int = 100,
+        delete_batch_size: int = 1000,
+        manifest: Optional[IndexManifest] = None,
+        dry_run: bool = False,
+        delete_missing: bool = True,
+        report_every: float = 10.0
+    ) -> IngestStats:
+    """Incrementally sync the index with the given files.
+
+    Files stream through chunking (process pool), and only chunks whose
+    content hash is missing from the manifest are embedded (thread pool) and
+    upserted; chunks that no longer exist are deleted at the end. At most
+    `2 * workers` files are being chunked and `embed_concurrency` embedding
+    requests are in flight at once, so memory stays bounded regardless of
+    corpus size. With `dry_run`, nothing is embedded, upserted or deleted.
+
+    `paths` must cover the whole corpus unless `delete_missing` is False,
+    otherwise chunks of files outside `paths` are treated as vanished.
+    """
+    workers = workers or os.cpu_count() or 1
+    manifest = manifest or IndexManifest(None, chunker_fingerprint(chunk_size, chunk_overlap))
+    count_tokens = _token_counter() if dry_run else None
+    stats = IngestStats()
+    last_report = time.monotonic()
+
+    known_by_source = manifest.ids_by_source()
+    live_ids: set[str] = set()
+    live_sources: set[str] = set()
+    buffer: list[dict] = []
+    fingerprints: dict[str, str] = {}
+    chunk_futures: dict[Future, str] = {}
+    embed_futures: dict[Future, list[dict]] = {}
+
+    def finish_embeds(futures):
+        nonlocal last_report
+        for future in futures:
+            batch = embed_futures.pop(future)
+            vectors = future.result()
+            for start in range(0, len(batch), upsert_batch_size):
+                sink.upsert(batch[start:start + upsert_batch_size], vectors[start:start + upsert_batch_size])
+            manifest.add_chunks(batch)
+            stats.chunks += len(batch)
+            stats.embed_batches += 1
+        if time.monotonic() - last_report >= report_every:
+            print(f"⏳ {stats.chunks}/{stats.new_chunks} chunks upserted ({stats.chunks_per_sec:.1f} chunks/sec)")
+            last_report = time.monotonic()
+
+    def collect_embeds(limit: int):
+        """Handle finished embeddings, blocking while more than `limit` are in flight."""
+        finish_embeds([f for f in list(embed_futures) if f.done()])
+        while len(embed_futures) > limit:
+            done, _ = wait(embed_futures, return_when=FIRST_COMPLETED)
+            finish_embeds(done)
+
+    def submit_embeds(flush: bool = False):
+        nonlocal buffer
+        while len(buffer) >= embed_batch_size or (flush and buffer):
+            batch, buffer = buffer[:embed_batch_size], buffer[embed_batch_size:]
+            collect_embeds(embed_concurrency - 1)
+            embed_futures[embed_pool.submit(embedder.embed, [c["text"] for c in batch])] = batch
+
+    def finish_chunks(futures):
+        for future in futures:
+            source = chunk_futures.pop(future)
+            stats.files += 1
+            new_chunks = []
+            for chunk in future.result():
+                live_ids.add(chunk["id"])
+                if chunk["id"] in manifest.chunks:
+                    stats.unchanged_chunks += 1
+                else:
+                    new_chunks.append(chunk)
+            stats.new_chunks += len(new_chunks)
+            if dry_run:
+                stats.estimated_tokens += sum(count_tokens(c["text"]) for c in new_chunks)
+            else:
+                buffer.extend(new_chunks)
+        if not dry_run:
+            submit_embeds()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as chunk_pool, \
+                ThreadPoolExecutor(max_workers=embed_concurrency) as embed_pool:
+            for path, source in iter_source_files(paths):
+                live_sources.add(source)
+                fingerprint = _file_fingerprint(path)
+                if manifest.source_unchanged(source, fingerprint):
+                    stats.skipped_files += 1
+                    known = known_by_source.get(source, [])
+                    live_ids.update(known)
+                    stats.unchanged_chunks += len(known)
+                    continue
+                while len(chunk_futures) >= workers * 2:
+                    done, _ = wait(chunk_futures, return_when=FIRST_COMPLETED)
+                    finish_chunks(done)
+                fingerprints[source] = fingerprint
+                chunk_futures[chunk_pool.submit(chunk_file, str(path), source, chunk_size, chunk_overlap)] = source
+
+            while chunk_futures:
+                done, _ = wait(chunk_futures, return_when=FIRST_COMPLETED)
+                finish_chunks(done)
+            if not dry_run:
+                submit_embeds(flush=True)
+                collect_embeds(0)
+
+    except BaseException:
+        # Keep the progress made so far so the next run doesn't re-embed it
+        if not dry_run:
+            manifest.save()
+        raise
+
+    # Anything in the manifest that the chunker no longer produces is stale
+    vanished = [chunk_id for chunk_id in manifest.chunks if chunk_id not in live_ids] if delete_missing else []
+    stats.deleted_chunks = len(vanished)
+    if not dry_run:
+        for start in range(0, len(vanished), delete_batch_size):
+            batch = vanished[start:start + delete_batch_size]
+            sink.delete(batch)
+            manifest.remove_chunks(batch)
+        # Only now is every chunked file fully in sync, so an interrupted run
+        # re-chunks files (cheap) but never re-embeds upserted chunks
+        for source, fingerprint in fingerprints.items():
+            manifest.mark_source(source, fingerprint)
+        if delete_missing:
+            manifest.forget_sources(live_sources)
+        manifest.save()
+
+    return stats
@@ -0,0 +1,68 @@
+import os
+import pathlib
+from typing import Optional
+
+
+def default_manifest_path(
+        target: str,
+        name: str,
+        persist_dir: Optional[str] = None,
+        namespace: Optional[str] = None
+    ) -> str:
+    """Chroma keeps its manifest inside the persist directory next to the data.
+
+    Pinecone has nowhere local, so its manifest lives under .ingest/, one per
+    index and namespace. That file is local to this checkout: re-index from
+    the same place, or copy it (or pass --manifest) when moving.
+    """
+    if target == "chroma" and persist_dir:
+        return str(pathlib.Path(persist_dir) / f"{name}.manifest.json")
+    suffix = f"-{namespace}" if namespace else ""
+    return str(pathlib.Path(".ingest") / f"{target}-{name}{suffix}.manifest.json")
+
+
+class PineconeSink:
+    """Bulk upserts chunk vectors into the Pinecone index the retriever queries."""
+
+    def __init__(self, index_name: Optional[str] = None, namespace: Optional[str] = None):
+        from pinecone import Pinecone
+
+        self.name = index_name or os.getenv("INDEX_NAME")
+        self.namespace = namespace
+        self.index = Pinecone(api_key=os.getenv("PINECONE_API_KEY")).Index(self.name)
+
+    def upsert(self, chunks: list[dict], vectors: list[list[float]]):
+        # PineconeVectorStore reads the page content from the "text" metadata key
+        self.index.upsert(
+            vectors=[
+                {"id": chunk["id"], "values": vector, "metadata": {**chunk["metadata"], "text": chunk["text"]}}
+                for chunk, vector in zip(chunks, vectors)
+            ],
+            namespace=self.namespace,
+        )
+
+    def delete(self, ids: list[str]):
+        self.index.delete(ids=ids, namespace=self.namespace)
+
+
+class ChromaSink:
+    """Bulk upserts chunk vectors into the Chroma collection BookRetrieverTool reads."""
+
+    def __init__(self, collection_name: Optional[str] = None, persist_dir: Optional[str] = None):
+        import chromadb
+
+        self.name = collection_name or os.getenv("COLLECTION_NAME")
+        self.persist_dir = persist_dir or os.getenv("PERSIST_DIR")
+        client = chromadb.PersistentClient(path=self.persist_dir)
+        self.collection = client.get_or_create_collection(self.name)
+
+    def upsert(self, chunks: list[dict], vectors: list[list[float]]):
+        self.collection.upsert(
+            ids=[chunk["id"] for chunk in chunks],
+            embeddings=vectors,
+            documents=[chunk["text"] for chunk in chunks],
+            metadatas=[chunk["metadata"] for chunk in chunks],
+        )
+
+    def delete(self, ids: list[str]):
+        self.collection.delete(ids=ids)
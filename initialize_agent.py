@@ -1,28 +1,60 @@
 from pydantic import BaseModel
 from langgraph.graph import StateGraph, START, END
-from agents import RouterNode, RagJudgeNode, AnswerNode, WebSearchNode
+from agents import RouterNode, RagJudgeNode, RouterJudgeNode, AnswerNode, WebSearchNode, WebCompressNode
 from states import AgentState
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.checkpoint.postgres import PostgresSaver
-from utils.graph_visualizaer import save_graph, visualize_graph
+from checkpointers import BoundedMemorySaver
+from utils.migrations import ensure_schema
 from langchain_core.messages import HumanMessage
-from typing import Optional
+from typing import Literal, Optional
 import os
 
 class Agent:
-    def __init__(self, config: Optional[dict] = None):
-        self.router = RouterNode()
-        self.rag_lookup = RagJudgeNode()
+    def __init__(
+            self,
+            config: Optional[dict] = None,
+            topology: Optional[Literal["separate", "combined"]] = None
+        ):
+        # "separate": the router picks a route, then RAG questions are
+        # retrieved and judged in a second LLM call.
+        # "combined": retrieve first, then one call both routes and judges.
+        self.topology = topology or os.getenv("AGENT_TOPOLOGY", "separate")
+        if self.topology not in ("separate", "combined"):
+            raise ValueError(f"Unknown agent topology: {self.topology}")
+
         self.web_search = WebSearchNode()
+        self.web_compress = WebCompressNode()
         self.answer = AnswerNode()
 
         self.graph = StateGraph(AgentState)
 
-        self.graph.add_node("router", self.router)
-        self.graph.add_node("rag_lookup", self.rag_lookup)
+        if self.topology == "combined":
+            self._add_combined_nodes()
+        else:
+            self._add_separate_nodes()
+
         self.graph.add_node("web_search", self.web_search)
+        self.graph.add_node("web_compress", self.web_compress)
         self.graph.add_node("answer", self.answer)
 
+        self.graph.add_edge("web_search", "web_compress")
+        self.graph.add_edge("web_compress", "answer")
+
+        self.graph.add_edge("answer", END)
+        
+        self.agent = self.graph.compile(
+            checkpointer = self._init_checkpointer(),
+        )
+
+        self.config = config
+
+    def _add_separate_nodes(self):
+        self.router = RouterNode()
+        self.rag_lookup = RagJudgeNode()
+        self.rag_search = self.rag_lookup.rag_search
+
+        self.graph.add_node("router", self.router)
+        self.graph.add_node("rag_lookup", self.rag_lookup)
+
         self.graph.set_entry_point("router")
 
         self.graph.add_conditional_edges(
@@ -44,46 +76,83 @@ class Agent:
             }
         )
 
-        self.graph.add_edge("web_search", "answer")
+    def _add_combined_nodes(self):
+        self.router_judge = RouterJudgeNode()
+        self.rag_search = self.router_judge.rag_search
 
-        self.graph.add_edge("answer", END)
-        
-        self.agent = self.graph.compile(
-            checkpointer = self._init_checkpointer(),
-        )
+        self.graph.add_node("router_judge", self.router_judge)
 
-        self.config = config
+        self.graph.set_entry_point("router_judge")
+
+        self.graph.add_conditional_edges(
+            "router_judge",
+            self.router_judge.after_router_judge,
+            {
+                "answer": "answer",
+                "web": "web_search"
+            }
+        )
 
     def _init_checkpointer(self):
         if os.getenv("CHECKPOINTER") == "postgres":
+            from langgraph.checkpoint.postgres import PostgresSaver
+            from psycopg.rows import dict_row
+            from psycopg_pool import ConnectionPool
             # print ("-"*60)
             # print("Using PostgresSaver")
             # print(f"Connection String: {os.getenv('SUPABASE_URL')}")
-            # PostgresSaver.from_conn_string returns a context manager
-            # We need to enter the context and keep the connection alive
-            checkpointer_cm = PostgresSaver.from_conn_string(
-                os.getenv("SUPABASE_URL")
+            # A pool lets one compiled graph serve concurrent requests instead
+            # of serializing every checkpoint read/write on a single connection
+            self._checkpointer_pool = ConnectionPool(
+                os.getenv("SUPABASE_URL"),
+                max_size=int(os.getenv("CHECKPOINTER_POOL_SIZE", 10)),
+                kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+                open=True,
             )
-            checkpointer = checkpointer_cm.__enter__()
+            serde = None
+            if os.getenv("CHECKPOINT_SERDE") == "compressed":
+                from checkpointers import CompressedSerializer
+                serde = CompressedSerializer(
+                    threshold=int(os.getenv("CHECKPOINT_COMPRESS_THRESHOLD", 1024))
+                )
+            checkpointer = PostgresSaver(self._checkpointer_pool, serde=serde)
             # print(f"Checkpointer: {checkpointer}")
-            # print("Setting up checkpointer tables")
-            checkpointer.setup()
+            # Checkpointer tables are created by the migration runner, which
+            # only touches the catalog when the schema is behind
+            ensure_schema(os.getenv("SUPABASE_URL"))
             # print ("-"*60)
-            # Store the context manager for later cleanup if needed
-            self._checkpointer_cm = checkpointer_cm
         else:
-            checkpointer = MemorySaver()
+            # Keeps recently active threads in RAM and spills the rest to a
+            # local SQLite file, so long-running processes don't grow unbounded
+            checkpointer = BoundedMemorySaver(
+                max_threads=int(os.getenv("MEMORY_CHECKPOINT_MAX_THREADS", 1000)),
+                max_bytes=int(float(os.getenv("MEMORY_CHECKPOINT_MAX_MB", 256)) * 1024 * 1024),
+                spill_path=os.getenv("MEMORY_CHECKPOINT_SPILL_PATH") or None,
+            )
+            self._memory_checkpointer = checkpointer
         return checkpointer
+
+    def close(self):
+        """Release the checkpointer's database connections or spill file, if any."""
+        pool = getattr(self, "_checkpointer_pool", None)
+        if pool is not None:
+            pool.close()
+        memory = getattr(self, "_memory_checkpointer", None)
+        if memory is not None:
+            memory.close()
         
     def visualize_agent_graph(self):
+        # IPython is only needed for visualization, so import it on demand
+        from utils.graph_visualizaer import visualize_graph
         visualize_graph(self.agent)
 
     def save_agent_graph(self, path: str):
+        from utils.graph_visualizaer import save_graph
         save_graph(self.agent, path)
 
-    def __call__(self, state: AgentState):
+    def __call__(self, state: AgentState, config: Optional[dict] = None):
         response = self.agent.invoke(
             state,
-            config = self.config
+            config = config or self.config
         )
         return response
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Production server: runs the API with multiple worker processes.
+
+Settings (environment variables):
+    PORT               Port to bind (default 8000)
+    WEB_CONCURRENCY    Number of worker processes (default 2)
+    PRELOAD_APP        Import the app once in the master before forking (default true)
+    WORKER_TIMEOUT     Seconds before a silent worker is restarted (default 120)
+"""
+
+import os
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=".env", override=True)
+
+
+def server_options() -> dict:
+    return {
+        "bind": f"0.0.0.0:{int(os.environ.get('PORT', 8000))}",
+        "workers": int(os.environ.get("WEB_CONCURRENCY", 2)),
+        "worker_class": "uvicorn_worker.UvicornWorker",
+        # Importing api opens no connections (pools, clients and the graph are
+        # created per worker in lifespan), so preloading is fork-safe and
+        # lets workers share the imported modules copy-on-write
+        "preload_app": os.environ.get("PRELOAD_APP", "true").lower() == "true",
+        "timeout": int(os.environ.get("WORKER_TIMEOUT", 120)),
+        "graceful_timeout": 30,
+        "accesslog": "-",
+    }
+
+
+def run():
+    options = server_options()
+    if options["workers"] > 1 and os.environ.get("TURN_LOCK_MODE") == "local":
+        print(f"⚠️  TURN_LOCK_MODE=local with {options['workers']} workers: concurrent sends to one chat "
+              "that land on different workers can fork its history; use TURN_LOCK_MODE=postgres")
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        # gunicorn is unavailable on Windows; fall back to uvicorn's supervisor
+        import uvicorn
+        host, port = options["bind"].rsplit(":", 1)
+        uvicorn.run("api:app", host=host, port=int(port), workers=options["workers"])
+        return
+
+    class LilyServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            from api import app
+            return app
+
+    LilyServer().run()
+
+
+if __name__ == "__main__":
+    run()
@@ -1 +1,2 @@
-from .state import AgentState
\ No newline at end of file
+from .state import AgentState
+from .deadline import deadline_in, time_remaining
@@ -0,0 +1,17 @@
+import math
+import time
+
+from .state import AgentState
+
+
+def deadline_in(seconds: float) -> float:
+    """Deadline for a turn that must finish within `seconds` from now."""
+    return time.monotonic() + seconds
+
+
+def time_remaining(state: AgentState) -> float:
+    """Seconds left before the turn's deadline (infinite when none was set)."""
+    deadline = state.get("deadline")
+    if deadline is None:
+        return math.inf
+    return deadline - time.monotonic()
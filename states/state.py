@@ -1,9 +1,16 @@
 from typing import TypedDict, Literal, Annotated
 from langchain_core.messages import BaseMessage
 from langgraph.graph.message import add_messages
+from langgraph.channels.untracked_value import UntrackedValue
 
 class AgentState(TypedDict, total=False):
     messages: Annotated[list[BaseMessage], add_messages]
-    route: Literal["rag", "answer", "end"]
-    rag: str
-    web: str
\ No newline at end of file
+    route: Literal["rag", "answer", "web", "end"]
+    # Per-turn retrieval context: shared between nodes within a run but never
+    # written to the checkpointer, so checkpoints only hold messages + routing
+    rag_docs: Annotated[str, UntrackedValue]
+    web: Annotated[str, UntrackedValue]
+    web_results: Annotated[list[dict], UntrackedValue]
+    # time.monotonic() by which the turn should finish; nodes cut optional
+    # work (judge, web search, answer length) as it approaches
+    deadline: Annotated[float, UntrackedValue]
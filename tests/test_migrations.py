@@ -0,0 +1,62 @@
+"""Concurrent migrations against a fresh database.
+
+Needs a Postgres server: set TEST_DATABASE_URL to a connection string whose
+user may create databases. A throwaway database is created per test.
+"""
+
+import multiprocessing
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+psycopg = pytest.importorskip("psycopg")
+pytest.importorskip("langgraph.checkpoint.postgres")
+
+from psycopg.conninfo import make_conninfo  # noqa: E402
+
+from utils.migrations import HEAD_VERSION, MIGRATIONS, current_version, migrate  # noqa: E402
+
+ADMIN_URL = os.getenv("TEST_DATABASE_URL")
+pytestmark = pytest.mark.skipif(not ADMIN_URL, reason="TEST_DATABASE_URL not set")
+
+
+@pytest.fixture
+def fresh_database():
+    name = f"lily_migrations_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(ADMIN_URL, autocommit=True) as admin:
+        admin.execute(f'CREATE DATABASE "{name}"')
+    try:
+        yield make_conninfo(ADMIN_URL, dbname=name)
+    finally:
+        with psycopg.connect(ADMIN_URL, autocommit=True) as admin:
+            admin.execute(f'DROP DATABASE IF EXISTS "{name}" WITH (FORCE)')
+
+
+def _migrate(conn_string, results):
+    results.put(migrate(conn_string))
+
+
+def test_concurrent_migrators_reach_head(fresh_database):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    workers = [context.Process(target=_migrate, args=(fresh_database, results)) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=120)
+
+    hung = [worker for worker in workers if worker.is_alive()]
+    for worker in hung:
+        worker.kill()
+    assert not hung, "migrators deadlocked"
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    applied = sorted(results.get(timeout=5) for _ in workers)
+    # One process applies everything; the other waits and finds the schema at head
+    assert applied == [0, len(MIGRATIONS)]
+    with psycopg.connect(fresh_database) as conn:
+        assert current_version(conn) == HEAD_VERSION
@@ -1,3 +1,19 @@
-from .book_retriever import BookRetrieverTool
-from .pinecone_book_retriever import PineconeBookRetrieverTool
-from .web_search import WebSearchTool
\ No newline at end of file
+import importlib
+
+# Tools pull in heavy vendor SDKs (chromadb, pinecone, tavily), so each one is
+# imported on first access instead of when the package is imported.
+_LAZY_TOOLS = {
+    "BookRetrieverTool": ".book_retriever",
+    "PineconeBookRetrieverTool": ".pinecone_book_retriever",
+    "WebSearchTool": ".web_search",
+}
+
+__all__ = list(_LAZY_TOOLS)
+
+def __getattr__(name):
+    if name in _LAZY_TOOLS:
+        module = importlib.import_module(_LAZY_TOOLS[name], __name__)
+        value = getattr(module, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
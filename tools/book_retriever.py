@@ -1,6 +1,4 @@
 import os
-from langchain_chroma import Chroma
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.tools import BaseTool
 from typing import Optional
 from pydantic import Field, PrivateAttr
@@ -44,6 +42,8 @@ class BookRetrieverTool(BaseTool):
         print(f"Persist directory: {self._persist_dir}")
         print(f"K: {self._k}")
         print("-"*50)
+        from langchain_chroma import Chroma
+        from langchain_openai import OpenAIEmbeddings
         vectordb = Chroma(
             collection_name=self._collection_name,
             embedding_function=OpenAIEmbeddings(model=self._embedding_model),
@@ -1,10 +1,8 @@
 import os
-from langchain_openai import OpenAIEmbeddings
 from langchain_core.tools import BaseTool
 from typing import Optional
 from pydantic import Field, PrivateAttr
-from pinecone import Pinecone
-from langchain_pinecone import PineconeVectorStore
+from utils.resilience import HedgeBudget, LatencyTracker, get_breaker, hedged_call
 
 class PineconeBookRetrieverTool(BaseTool):
     name: str = "book_retriever_tool"
@@ -18,6 +16,8 @@ class PineconeBookRetrieverTool(BaseTool):
     _embedding_model: Optional[str] = PrivateAttr()
     _k: Optional[int] = PrivateAttr()
     _retriever: object = PrivateAttr()
+    _latency: LatencyTracker = PrivateAttr(default_factory=LatencyTracker)
+    _hedge_budget: HedgeBudget = PrivateAttr(default_factory=HedgeBudget)
     
     def __init__(
         self,
@@ -42,7 +42,8 @@ class PineconeBookRetrieverTool(BaseTool):
         # print(f"Embedding model: {self._embedding_model}")
         # print(f"K: {self._k}")
         # print("-"*50)
-        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+        from langchain_openai import OpenAIEmbeddings
+        from langchain_pinecone import PineconeVectorStore
 
         vectorstore = PineconeVectorStore(
             index_name=self._index_name,
@@ -57,13 +58,20 @@ class PineconeBookRetrieverTool(BaseTool):
 
     def _run(self, query: str) -> str:
         """
-        Execute the book search with error handling
+        Execute the book search; returns "" when nothing was found or Pinecone is unavailable
         """
+        # Retrieval is idempotent, so a request slower than the recent p95 is
+        # raced by a second one (for at most ~10% of calls); the breaker skips
+        # Pinecone while it's failing
+        breaker = get_breaker("pinecone", slow_call_seconds=2.0)
         try:
-            docs = self._retriever.invoke(query)
-            return "\n\n".join(doc.page_content for doc in docs) if docs else "No books found"
+            docs = breaker.call(
+                hedged_call, self._retriever.invoke, query, latency=self._latency, budget=self._hedge_budget
+            )
         except Exception as e:
-            return f"Retrieval Error: {str(e)}"
+            print(f"Retrieval Error: {e}")
+            return ""
+        return "\n\n".join(doc.page_content for doc in docs) if docs else ""
 
 # Usage:
 # book_tool = BookRetrieverTool()
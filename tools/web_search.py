@@ -1,9 +1,9 @@
 import os
-from langchain_tavily import TavilySearch
 from langchain_core.tools import tool
 from typing import Optional
 from langchain_core.tools import BaseTool
 from pydantic import Field, PrivateAttr
+from utils.resilience import get_breaker
 
 class WebSearchTool(BaseTool):
     name: str = "web_search_tool"
@@ -20,26 +20,39 @@ class WebSearchTool(BaseTool):
             api_key=api_key or os.getenv("TAVILY_API_KEY"),
             **kwargs
         )
+        from langchain_tavily import TavilySearch
         self._tavily_search = TavilySearch(api_key=self.api_key)
 
+    def search(self, query: str) -> list[dict]:
+        """Return raw Tavily results as [{"title", "url", "content"}]; raises on failure.
+
+        Raises CircuitOpen without calling Tavily while its breaker is open.
+        Unlike book retrieval this isn't hedged: every Tavily search is
+        billed, and the breaker already cuts off a slow Tavily.
+        """
+        response = get_breaker("tavily", slow_call_seconds=5.0).call(self._tavily_search.invoke, {"query": query})
+        if not isinstance(response, dict) or "results" not in response:
+            raise ValueError(f"Unexpected Tavily response: {response}")
+        return [
+            {
+                "title": item.get('title', 'No title'),
+                "url": item.get('url', ''),
+                "content": item.get('content', 'No content'),
+            }
+            for item in response['results']
+        ]
+
     def _run(self, query: str) -> str:
         """Core tool function to search the web for the query"""
         try:
-            response = self._tavily_search.invoke({"query": query})
-
-            if isinstance(response, dict) and "results" in response:
-                formatted_results = []
-                for item in response['results']:
-                    title = item.get('title', 'No title')
-                    url = item.get('url', '')
-                    content = item.get('content', 'No content')
-                    formatted_results.append(f"Title: {title}\nContent: {content}\nURL: {url}\n")
-
-                return "\n\n".join(formatted_results) if formatted_results else "No results found"
-            else:
-                return str(response)
+            formatted_results = [
+                f"Title: {item['title']}\nContent: {item['content']}\nURL: {item['url']}\n"
+                for item in self.search(query)
+            ]
+            return "\n\n".join(formatted_results)
         except Exception as e:
-            return f"Web Error: {str(e)}"
+            print(f"Web Error: {e}")
+            return ""
 
 # Usage in agent:
 # web_tool = WebSearchTool()
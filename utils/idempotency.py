@@ -0,0 +1,130 @@
+"""Stored responses for `Idempotency-Key` retries of chat turns."""
+
+import hashlib
+import random
+import time
+from typing import Callable, Optional
+
+from psycopg.types.json import Jsonb
+
+
+class IdempotencyKeyReused(Exception):
+    """The key was already used for a different request."""
+
+
+class IdempotencyInProgress(Exception):
+    """The original request is still running after waiting `wait_timeout`."""
+
+
+def request_fingerprint(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+class IdempotencyStore:
+    """Claims idempotency keys in the `idempotency_keys` table.
+
+    The first request with a key claims it (status `in_flight`) and runs the
+    turn; repeats within `ttl` seconds get the stored response, and a
+    concurrent repeat waits for the first run instead of starting another.
+    An `in_flight` claim older than `lease` seconds is assumed to belong to a
+    crashed worker and can be taken over.
+    """
+
+    def __init__(
+            self,
+            get_connection: Callable,
+            ttl: float = 24 * 3600,
+            lease: float = 300,
+            wait_timeout: float = 60,
+            poll_interval: float = 0.25
+        ):
+        self.get_connection = get_connection
+        self.ttl = ttl
+        self.lease = lease
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+
+    def _claim(self, cur, user_id: str, key: str, thread_id: str, request_hash: str) -> bool:
+        cur.execute("""
+            INSERT INTO idempotency_keys (user_id, idempotency_key, thread_id, request_hash)
+            VALUES (%s, %s, %s, %s)
+            ON CONFLICT (user_id, idempotency_key) DO UPDATE
+                SET thread_id = EXCLUDED.thread_id,
+                    request_hash = EXCLUDED.request_hash,
+                    status = 'in_flight',
+                    response = NULL,
+                    created_at = CURRENT_TIMESTAMP,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE idempotency_keys.created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                   OR (idempotency_keys.status = 'in_flight'
+                       AND idempotency_keys.updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s))
+            RETURNING 1
+        """, (user_id, key, thread_id, request_hash, self.ttl, self.lease))
+        return cur.fetchone() is not None
+
+    def begin(self, user_id: str, key: str, thread_id: str, request_hash: str) -> Optional[dict]:
+        """Claim the key; return the stored response for a completed repeat.
+
+        Returns None when the caller owns the key and must run the request,
+        then call `complete` or `release`.
+        """
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            row = None
+            with self.get_connection() as conn:
+                with conn.cursor() as cur:
+                    claimed = self._claim(cur, user_id, key, thread_id, request_hash)
+                    if not claimed:
+                        cur.execute(
+                            "SELECT request_hash, status, response FROM idempotency_keys "
+                            "WHERE user_id = %s AND idempotency_key = %s",
+                            (user_id, key)
+                        )
+                        row = cur.fetchone()
+                    conn.commit()
+
+            if claimed:
+                # Expired keys are reclaimed lazily; occasionally sweep the rest
+                if random.random() < 0.01:
+                    self.purge_expired()
+                return None
+            if row is None:
+                # Released between our claim attempt and the lookup; try again
+                continue
+            stored_hash, status, response = row
+            if stored_hash != request_hash:
+                raise IdempotencyKeyReused()
+            if status == "done":
+                return response
+            if time.monotonic() >= deadline:
+                raise IdempotencyInProgress()
+            time.sleep(self.poll_interval)
+
+    def complete(self, user_id: str, key: str, response: dict):
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE idempotency_keys SET status = 'done', response = %s, updated_at = CURRENT_TIMESTAMP "
+                    "WHERE user_id = %s AND idempotency_key = %s",
+                    (Jsonb(response), user_id, key)
+                )
+                conn.commit()
+
+    def release(self, user_id: str, key: str):
+        """Forget a failed run so the client's retry executes again."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM idempotency_keys WHERE user_id = %s AND idempotency_key = %s AND status = 'in_flight'",
+                    (user_id, key)
+                )
+                conn.commit()
+
+    def purge_expired(self):
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "DELETE FROM idempotency_keys WHERE created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)",
+                    (self.ttl,)
+                )
+                conn.commit()
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Report per-module import cost of the API so cold start stays under budget.
+
+Usage:
+    python utils/import_benchmark.py                 # profile `import api`
+    python utils/import_benchmark.py -m initialize_agent --top 30
+    python utils/import_benchmark.py --budget-ms 1500  # exit 1 when over budget
+"""
+
+import argparse
+import os
+import pathlib
+import subprocess
+import sys
+from collections import defaultdict
+
+ROOT = pathlib.Path(__file__).parents[1]
+
+
+def measure_imports(module: str) -> list[tuple[str, int, int]]:
+    """Import `module` in a fresh interpreter and return (name, self_us, cumulative_us)."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        env={**os.environ, "PYTHONDONTWRITEBYTECODE": "1"},
+    )
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1] if result.stderr else "Import failed")
+        sys.exit(result.returncode)
+
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def report(module: str, top: int, budget_ms: float | None):
+    rows = measure_imports(module)
+    total_us = next((cum for name, _, cum in rows if name == module), sum(s for _, s, _ in rows))
+
+    packages = defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"📦 import {module}: {total_us / 1000:.1f} ms total ({len(rows)} modules)\n")
+    print("Slowest top-level packages (self time):")
+    for package, self_us in sorted(packages.items(), key=lambda p: p[1], reverse=True)[:top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    print("\nSlowest modules (cumulative):")
+    for name, _, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+    if budget_ms is not None:
+        if total_us / 1000 > budget_ms:
+            print(f"\n❌ Import time exceeds budget of {budget_ms:.0f} ms")
+            sys.exit(1)
+        print(f"\n✅ Import time within budget of {budget_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-m", "--module", default="api", help="Module to import (default: api)")
+    parser.add_argument("--top", type=int, default=15, help="Number of rows to show per table")
+    parser.add_argument("--budget-ms", type=float, default=None, help="Fail when total import time exceeds this")
+    args = parser.parse_args()
+    report(args.module, args.top, args.budget_ms)
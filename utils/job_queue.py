@@ -0,0 +1,158 @@
+"""Postgres-backed queue of chat turns for asynchronous processing."""
+
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+from psycopg.types.json import Jsonb
+
+FINISHED_STATUSES = ("done", "failed")
+
+
+class JobQueue:
+    """Chat turns stored in the `chat_jobs` table.
+
+    Workers claim jobs with `FOR UPDATE SKIP LOCKED`, so any number of
+    threads or processes can pull from the same queue without blocking each
+    other or running a job twice. A job left `running` longer than `lease`
+    seconds (its worker died) is put back in the queue up to `max_attempts`.
+    """
+
+    def __init__(self, get_connection: Callable, lease: float = 600, max_attempts: int = 3):
+        self.get_connection = get_connection
+        self.lease = lease
+        self.max_attempts = max_attempts
+
+    def enqueue(self, user_id: str, thread_id: str, message: str) -> str:
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "INSERT INTO chat_jobs (user_id, thread_id, message) VALUES (%s, %s, %s) RETURNING id",
+                    (user_id, thread_id, message)
+                )
+                job_id = cur.fetchone()[0]
+                conn.commit()
+        return str(job_id)
+
+    def claim(self) -> Optional[dict]:
+        """Take the oldest queued job, or return None if the queue is empty."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE chat_jobs
+                    SET status = 'running', started_at = CURRENT_TIMESTAMP, attempts = attempts + 1
+                    WHERE id = (
+                        SELECT id FROM chat_jobs
+                        WHERE status = 'queued'
+                        ORDER BY created_at
+                        FOR UPDATE SKIP LOCKED
+                        LIMIT 1
+                    )
+                    RETURNING id, user_id, thread_id, message
+                """)
+                row = cur.fetchone()
+                conn.commit()
+        if row is None:
+            return None
+        return {"job_id": str(row[0]), "user_id": str(row[1]), "thread_id": row[2], "message": row[3]}
+
+    def complete(self, job_id: str, response: dict):
+        self._finish(job_id, "done", response=Jsonb(response))
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, "failed", error=error)
+
+    def _finish(self, job_id: str, status: str, response=None, error: Optional[str] = None):
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "UPDATE chat_jobs SET status = %s, response = %s, error = %s, finished_at = CURRENT_TIMESTAMP "
+                    "WHERE id = %s",
+                    (status, response, error, job_id)
+                )
+                conn.commit()
+
+    def requeue_stale(self) -> int:
+        """Return jobs abandoned by dead workers to the queue (or fail them)."""
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE chat_jobs
+                    SET status = CASE WHEN attempts < %s THEN 'queued' ELSE 'failed' END,
+                        error = CASE WHEN attempts < %s THEN NULL ELSE 'Worker lost' END
+                    WHERE status = 'running'
+                      AND started_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+                """, (self.max_attempts, self.max_attempts, self.lease))
+                count = cur.rowcount
+                conn.commit()
+        return count
+
+    def get(self, job_id: str, user_id: str, thread_id: str) -> Optional[dict]:
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT status, response, error FROM chat_jobs WHERE id = %s AND user_id = %s AND thread_id = %s",
+                    (job_id, user_id, thread_id)
+                )
+                row = cur.fetchone()
+        if row is None:
+            return None
+        return {"job_id": job_id, "status": row[0], "response": row[1], "error": row[2]}
+
+
+class JobWorkerPool:
+    """Threads that pull jobs from a JobQueue and run `handler(job) -> dict`."""
+
+    def __init__(
+            self,
+            queue: JobQueue,
+            handler: Callable[[dict], dict],
+            concurrency: int = 2,
+            poll_interval: float = 0.5,
+            stale_check_interval: float = 60
+        ):
+        self.queue = queue
+        self.handler = handler
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.stale_check_interval = stale_check_interval
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+        self._last_stale_check = 0.0
+
+    def start(self):
+        for i in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"chat-job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if time.monotonic() - self._last_stale_check >= self.stale_check_interval:
+                    self._last_stale_check = time.monotonic()
+                    self.queue.requeue_stale()
+                job = self.queue.claim()
+            except Exception as e:
+                print(f"Job queue error: {e}")
+                self._stop.wait(self.poll_interval * 4)
+                continue
+
+            if job is None:
+                self._stop.wait(self.poll_interval)
+                continue
+
+            try:
+                self.queue.complete(job["job_id"], self.handler(job))
+            except Exception as e:
+                traceback.print_exc()
+                try:
+                    self.queue.fail(job["job_id"], str(getattr(e, "detail", e)))
+                except Exception as fail_error:
+                    print(f"Could not record failure of job {job['job_id']}: {fail_error}")
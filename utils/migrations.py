@@ -0,0 +1,188 @@
+"""Versioned schema migrations for the Lily database.
+
+Every process calls `ensure_schema()` on startup. When the database is
+already at head this costs a single `SELECT max(version)` query; otherwise
+one process takes a Postgres advisory lock and applies the pending
+migrations while the others poll until the schema is at head.
+
+To change the schema, append a new entry to MIGRATIONS. Never edit or
+reorder an entry that has already been applied.
+"""
+
+import os
+import threading
+import time
+from typing import Callable
+
+import psycopg
+
+# Arbitrary constant shared by every process that migrates this database
+MIGRATION_LOCK_KEY = 5_271_001
+
+
+def _setup_checkpointer(conn_string: str):
+    """Create the LangGraph checkpointer tables (PostgresSaver runs its own migrations)."""
+    from langgraph.checkpoint.postgres import PostgresSaver
+
+    with PostgresSaver.from_conn_string(conn_string) as checkpointer:
+        checkpointer.setup()
+
+
+# (version, description, SQL string or callable taking the connection string)
+MIGRATIONS: list[tuple[int, str, str | Callable[[str], None]]] = [
+    (1, "create lily_users", """
+        CREATE TABLE IF NOT EXISTS lily_users (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            username VARCHAR(50) UNIQUE NOT NULL,
+            password_hash VARCHAR(64) NOT NULL,
+            email VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """),
+    (2, "create chat_threads", """
+        CREATE TABLE IF NOT EXISTS chat_threads (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            thread_id VARCHAR(100) UNIQUE NOT NULL,
+            user_id UUID REFERENCES lily_users(id) ON DELETE CASCADE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """),
+    # Re-add a checkpointer entry when upgrading langgraph-checkpoint-postgres
+    # brings new checkpointer migrations.
+    (3, "create checkpointer tables", _setup_checkpointer),
+    (4, "create idempotency_keys", """
+        CREATE TABLE IF NOT EXISTS idempotency_keys (
+            user_id UUID NOT NULL,
+            idempotency_key VARCHAR(255) NOT NULL,
+            thread_id VARCHAR(100) NOT NULL,
+            request_hash VARCHAR(64) NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'in_flight',
+            response JSONB,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user_id, idempotency_key)
+        )
+    """),
+    (5, "create chat_jobs", """
+        CREATE TABLE IF NOT EXISTS chat_jobs (
+            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+            user_id UUID NOT NULL,
+            thread_id VARCHAR(100) NOT NULL,
+            message TEXT NOT NULL,
+            status VARCHAR(16) NOT NULL DEFAULT 'queued',
+            response JSONB,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP
+        );
+        CREATE INDEX IF NOT EXISTS chat_jobs_queued_idx ON chat_jobs (created_at) WHERE status = 'queued'
+    """),
+]
+
+HEAD_VERSION = MIGRATIONS[-1][0]
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def current_version(conn: psycopg.Connection) -> int:
+    """Return the applied schema version, or 0 for a fresh database."""
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT max(version) FROM schema_migrations")
+            version = cur.fetchone()[0]
+        return version or 0
+    except psycopg.errors.UndefinedTable:
+        conn.rollback()
+        return 0
+
+
+def _lock_or_wait_for_head(conn: psycopg.Connection, verbose: bool = False) -> bool:
+    """Take the migration lock, or return False once another process reached head.
+
+    Waiters poll pg_try_advisory_lock instead of blocking in pg_advisory_lock:
+    a blocked statement is an open transaction, and the lock holder's
+    PostgresSaver.setup() runs CREATE INDEX CONCURRENTLY, which waits for
+    every open transaction, so the two would wait on each other forever.
+    """
+    delay = 0.1
+    while True:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_try_advisory_lock(%s)", (MIGRATION_LOCK_KEY,))
+            if cur.fetchone()[0]:
+                return True
+        if verbose and delay == 0.1:
+            print("⏳ Another process is migrating, waiting...")
+        time.sleep(delay)
+        delay = min(delay * 2, 1.0)
+        if current_version(conn) >= HEAD_VERSION:
+            return False
+
+
+def migrate(conn_string: str | None = None, verbose: bool = False) -> int:
+    """Apply pending migrations and return how many were applied."""
+    conn_string = conn_string or os.getenv("SUPABASE_URL")
+    if not conn_string:
+        raise RuntimeError("SUPABASE_URL not configured")
+
+    with psycopg.connect(conn_string, autocommit=True) as conn:
+        # Fast path: one cheap query when the schema is already at head
+        if current_version(conn) >= HEAD_VERSION:
+            if verbose:
+                print(f"✅ Database schema already at version {HEAD_VERSION}")
+            return 0
+
+        if not _lock_or_wait_for_head(conn, verbose):
+            return 0
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_migrations (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT NOT NULL,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+
+            # Another process may have migrated while we waited for the lock
+            version = current_version(conn)
+            applied = 0
+            for target, description, step in MIGRATIONS:
+                if target <= version:
+                    continue
+                if verbose:
+                    print(f"📋 Applying migration {target}: {description}...")
+                if callable(step):
+                    step(conn_string)
+                    conn.execute(
+                        "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                        (target, description)
+                    )
+                else:
+                    with conn.transaction():
+                        conn.execute(step)
+                        conn.execute(
+                            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s)",
+                            (target, description)
+                        )
+                applied += 1
+
+            if verbose:
+                print(f"✅ Database schema at version {HEAD_VERSION} ({applied} migration(s) applied)")
+            return applied
+        finally:
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_KEY,))
+
+
+def ensure_schema(conn_string: str | None = None):
+    """Migrate once per process; later calls return immediately."""
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            migrate(conn_string)
+            _schema_ready = True
@@ -0,0 +1,109 @@
+"""On-demand sampling profiles of individual API requests."""
+
+import contextvars
+import functools
+import hmac
+import pathlib
+import random
+import re
+import time
+from typing import Callable, Optional
+
+# Set by the middleware for requests that should be profiled; holds the
+# output path once the endpoint has written its profile
+_profile_request: contextvars.ContextVar[Optional[dict]] = contextvars.ContextVar("profile_request", default=None)
+
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]")
+
+
+class RequestProfiler:
+    """Samples the call stack of selected requests with pyinstrument.
+
+    A request is profiled when its `X-Profile-Token` header matches
+    `admin_token`, or at random for `sample_rate` of traffic. The middleware
+    only marks the request; the `profile` decorator runs the sampler inside
+    the endpoint itself, because sync endpoints run on a threadpool thread
+    that a profiler started on the event loop would not see. Unprofiled
+    requests only pay for a context variable lookup.
+
+    Each profile is written to `output_dir` as
+    `<timestamp>_<route>_<thread_id>.<ext>` in speedscope or HTML format.
+    """
+
+    HEADER = "X-Profile-Token"
+
+    def __init__(
+            self,
+            output_dir: str = "profiles",
+            admin_token: Optional[str] = None,
+            sample_rate: float = 0.0,
+            output_format: str = "speedscope",
+            interval: float = 0.001
+        ):
+        self.output_dir = pathlib.Path(output_dir)
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.output_format = output_format
+        self.interval = interval
+        self._unavailable = False
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.admin_token) or self.sample_rate > 0
+
+    def requested(self, token: Optional[str]) -> bool:
+        if token and self.admin_token and hmac.compare_digest(token, self.admin_token):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def middleware(self, request, call_next):
+        if not self.requested(request.headers.get(self.HEADER)):
+            return await call_next(request)
+        marker = {}
+        token = _profile_request.set(marker)
+        try:
+            response = await call_next(request)
+        finally:
+            _profile_request.reset(token)
+        if "path" in marker:
+            response.headers["X-Profile-File"] = marker["path"].name
+        return response
+
+    def profile(self, endpoint: Callable) -> Callable:
+        """Profile a sync endpoint when the current request was selected."""
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            marker = _profile_request.get()
+            if marker is None or self._unavailable:
+                return endpoint(*args, **kwargs)
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                print("Profiling requested but pyinstrument is not installed")
+                self._unavailable = True
+                return endpoint(*args, **kwargs)
+
+            profiler = Profiler(interval=self.interval, async_mode="disabled")
+            profiler.start()
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                profiler.stop()
+                try:
+                    marker["path"] = self._write(profiler, endpoint.__name__, kwargs.get("thread_id"))
+                except Exception as e:
+                    print(f"Could not write profile: {e}")
+        return wrapper
+
+    def _write(self, profiler, route: str, thread_id: Optional[str]) -> pathlib.Path:
+        stamp = time.strftime("%Y%m%dT%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+        name = _UNSAFE.sub("_", f"{stamp}_{route}_{thread_id or 'none'}")
+        if self.output_format == "html":
+            path, content = self.output_dir / f"{name}.html", profiler.output_html()
+        else:
+            from pyinstrument.renderers import SpeedscopeRenderer
+            path, content = self.output_dir / f"{name}.speedscope.json", profiler.output(SpeedscopeRenderer())
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        path.write_text(content, encoding="utf-8")
+        print(f"Wrote profile {path}")
+        return path
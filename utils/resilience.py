@@ -0,0 +1,275 @@
+"""Circuit breakers and hedged calls for upstream services (Pinecone, Tavily, OpenAI)."""
+
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Optional
+
+
+class CircuitOpen(Exception):
+    """The dependency's breaker is open; the call was not attempted."""
+
+
+class LatencyTracker:
+    """Rolling window of call latencies in seconds."""
+
+    def __init__(self, size: int = 200):
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """The p-th quantile (0-1) of recent latencies, or None without enough samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < 10:
+            return None
+        return samples[min(int(len(samples) * p), len(samples) - 1)]
+
+
+class CircuitBreaker:
+    """Stops calling a dependency that keeps failing or answering slowly.
+
+    Outcomes of the last `window` calls are kept; a call counts as bad if it
+    raised or took longer than `slow_call_seconds`. Once at least
+    `min_calls` were made and the share of bad calls reaches `failure_rate`
+    the breaker opens and calls fail fast with CircuitOpen. After
+    `reset_timeout` seconds a single trial call is let through: success
+    closes the breaker, another bad call keeps it open.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            failure_rate: float = 0.5,
+            slow_call_seconds: Optional[float] = None,
+            window: int = 20,
+            min_calls: int = 5,
+            reset_timeout: float = 30
+        ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.latency = LatencyTracker()
+        self._outcomes = deque(maxlen=window)  # True for a bad call
+        self._lock = threading.Lock()
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def is_open(self) -> bool:
+        """True while calls would be rejected (open and not yet due a trial)."""
+        with self._lock:
+            return self._opened_at is not None and (
+                self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout
+            )
+
+    def _allow(self) -> Optional[bool]:
+        """None to reject the call, otherwise whether it is the half-open trial."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+                self.rejected += 1
+                return None
+            self._trial_running = True
+            return True
+
+    def _record(self, seconds: float, ok: bool, trial: bool):
+        bad = not ok or (self.slow_call_seconds is not None and seconds > self.slow_call_seconds)
+        if ok:
+            self.latency.record(seconds)
+        with self._lock:
+            if trial:
+                self._trial_running = False
+                if bad:
+                    self._opened_at = time.monotonic()
+                else:
+                    self._opened_at = None
+                    self._outcomes.clear()
+                    print(f"Circuit breaker '{self.name}' closed")
+                return
+            if self._opened_at is not None:
+                # A call started before the breaker opened; the trial decides
+                return
+            self._outcomes.append(bad)
+            if len(self._outcomes) >= self.min_calls and \
+                    sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+                self._opened_at = time.monotonic()
+                self.opened += 1
+                print(f"Circuit breaker '{self.name}' opened")
+
+    def call(self, fn: Callable, *args, **kwargs):
+        trial = self._allow()
+        if trial is None:
+            raise CircuitOpen(self.name)
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            self._record(time.monotonic() - start, ok=False, trial=trial)
+            raise
+        self._record(time.monotonic() - start, ok=True, trial=trial)
+        return result
+
+    def stats(self) -> dict:
+        p50, p95 = self.latency.percentile(0.5), self.latency.percentile(0.95)
+        with self._lock:
+            state = "closed" if self._opened_at is None else "open"
+            bad = sum(self._outcomes)
+            calls = len(self._outcomes)
+        return {
+            "state": state,
+            "recent_calls": calls,
+            "recent_bad_calls": bad,
+            "opened": self.opened,
+            "rejected": self.rejected,
+            "latency_ms_p50": round(p50 * 1000, 1) if p50 is not None else None,
+            "latency_ms_p95": round(p95 * 1000, 1) if p95 is not None else None,
+        }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, **defaults) -> CircuitBreaker:
+    """The process-wide breaker for a dependency, created on first use.
+
+    `BREAKER_FAILURE_RATE` and `BREAKER_RESET_SECONDS` apply to every breaker;
+    `BREAKER_<NAME>_SLOW_SECONDS` overrides its slow-call threshold.
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            slow = os.getenv(f"BREAKER_{name.upper()}_SLOW_SECONDS")
+            options = {
+                "failure_rate": float(os.getenv("BREAKER_FAILURE_RATE", 0.5)),
+                "reset_timeout": float(os.getenv("BREAKER_RESET_SECONDS", 30)),
+                **defaults,
+            }
+            if slow is not None:
+                options["slow_call_seconds"] = float(slow) or None
+            _breakers[name] = CircuitBreaker(name, **options)
+        return _breakers[name]
+
+
+def breaker_open(name: str) -> bool:
+    """Whether the named dependency is currently being skipped."""
+    breaker = _breakers.get(name)
+    return breaker is not None and breaker.is_open
+
+
+def breaker_stats() -> dict:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.name: b.stats() for b in breakers}
+
+
+class HedgeBudget:
+    """Caps hedged requests at `ratio` of calls, with up to `burst` saved up."""
+
+    def __init__(self, ratio: float = 0.1, burst: float = 5):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 1.0
+        self._lock = threading.Lock()
+        self.hedged = 0
+
+    def earn(self):
+        with self._lock:
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedged += 1
+            return True
+
+
+# Every caller's first request runs here, so cover the 40 HTTP threads plus
+# job worker threads, with headroom for the hedges themselves
+_hedge_pool_size = int(os.getenv("HEDGE_POOL_SIZE", 64))
+_hedge_pool = ThreadPoolExecutor(max_workers=_hedge_pool_size, thread_name_prefix="hedge")
+_hedge_busy = 0
+_hedge_busy_lock = threading.Lock()
+
+
+def hedged_call(
+        fn: Callable,
+        *args,
+        latency: LatencyTracker,
+        budget: HedgeBudget,
+        percentile: float = 0.95,
+        min_delay: float = 0.05,
+        default_delay: float = 0.5,
+        **kwargs
+    ):
+    """Call an idempotent `fn`, sending a second identical request if the
+    first hasn't answered within the recent p95 latency.
+
+    The delay is measured from when the first request starts running, so
+    time spent queued for a pool thread is not mistaken for a slow
+    dependency. No second request is sent when `budget` is spent or every
+    pool thread is busy, so hedging can't multiply load under pressure. Whichever request succeeds first wins; the result
+    of the other is discarded (it can't be cancelled once running). Raises
+    only when every request sent fails. Successful requests record their
+    own latency in `latency`, including the losers, so the delay tracks
+    the dependency rather than the hedged result.
+    """
+    delay = latency.percentile(percentile)
+    delay = default_delay if delay is None else max(delay, min_delay)
+    budget.earn()
+    started = threading.Event()
+
+    def attempt():
+        global _hedge_busy
+        started.set()
+        start = time.monotonic()
+        try:
+            result = fn(*args, **kwargs)
+            latency.record(time.monotonic() - start)
+            return result
+        finally:
+            with _hedge_busy_lock:
+                _hedge_busy -= 1
+
+    def submit():
+        global _hedge_busy
+        with _hedge_busy_lock:
+            _hedge_busy += 1
+        # Each request runs in a copy of the caller's context so tracing callbacks still see it
+        return _hedge_pool.submit(contextvars.copy_context().run, attempt)
+
+    first = submit()
+    started.wait()
+    done, _ = wait([first], timeout=delay)
+    if done and first.exception() is None:
+        return first.result()
+
+    with _hedge_busy_lock:
+        saturated = _hedge_busy >= _hedge_pool_size
+    if saturated or not budget.spend():
+        return first.result()
+
+    # The first request is slow (or already failed): race a second one
+    pending = {first, submit()} - done
+    error = first.exception() if done else None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                return future.result()
+            error = future.exception()
+    raise error
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Compare checkpoint serializers on synthetic chat threads.
+
+Usage:
+    python utils/serde_benchmark.py                    # 10, 50 and 200 turn threads
+    python utils/serde_benchmark.py --turns 20 100 --iterations 200
+"""
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1]))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from checkpointers import CompressedSerializer
+
+WORDS = (
+    "baby sleep feeding schedule nap bottle breastfeeding pregnancy trimester "
+    "doctor pediatrician fever teething solids routine night wake crying "
+    "normal usually weeks months recommend try gently comfort safe signs"
+).split()
+
+
+def make_thread(turns: int, seed: int = 0) -> list:
+    """`turns` question/answer pairs with answers of a typical length."""
+    rng = random.Random(seed)
+    sentence = lambda n: " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+    messages = []
+    for _ in range(turns):
+        messages.append(HumanMessage(content=" ".join(sentence(12) for _ in range(2))))
+        messages.append(AIMessage(content="\n\n".join(
+            " ".join(sentence(rng.randint(10, 20)) for _ in range(4)) for _ in range(3)
+        )))
+    return messages
+
+
+def timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def benchmark(turns: list[int], iterations: int):
+    serializers = {"default": JsonPlusSerializer(), "compressed": CompressedSerializer()}
+    print(f"{'turns':>6} {'serializer':<11} {'type':<13} {'bytes':>9} {'dumps ms':>9} {'loads ms':>9}")
+    for count in turns:
+        thread = make_thread(count)
+        for name, serde in serializers.items():
+            typed = serde.dumps_typed(thread)
+            assert serde.loads_typed(typed) == thread
+            dumps_ms = timed(lambda: serde.dumps_typed(thread), iterations)
+            loads_ms = timed(lambda: serde.loads_typed(typed), iterations)
+            print(f"{count:>6} {name:<11} {typed[0]:<13} {len(typed[1]):>9} {dumps_ms:>9.3f} {loads_ms:>9.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, nargs="+", default=[10, 50, 200], help="Thread lengths to test")
+    parser.add_argument("--iterations", type=int, default=100, help="Repetitions per measurement")
+    args = parser.parse_args()
+    benchmark(args.turns, args.iterations)
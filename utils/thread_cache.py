@@ -0,0 +1,64 @@
+"""In-process cache of chat thread ownership."""
+
+from collections import OrderedDict
+import threading
+import time
+
+
+class ThreadOwnershipCache:
+    """Bounded LRU cache of (user_id, thread_id) -> owned.
+
+    Positive results expire after `positive_ttl` so a thread deleted through
+    another worker (which can only invalidate its own cache) stops being
+    served within that time. Negative results expire after a short TTL so a
+    thread created by another worker becomes visible quickly.
+    """
+
+    def __init__(self, max_size: int = 10000, negative_ttl: float = 30.0, positive_ttl: float = 60.0):
+        self.max_size = max_size
+        self.negative_ttl = negative_ttl
+        self.positive_ttl = positive_ttl
+        self._entries: "OrderedDict[tuple[str, str], tuple[bool, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, thread_id: str) -> bool | None:
+        """Return the cached ownership, or None when unknown or expired."""
+        key = (user_id, thread_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            owned, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return owned
+
+    def set(self, user_id: str, thread_id: str, owned: bool):
+        key = (user_id, thread_id)
+        expires_at = time.monotonic() + (self.positive_ttl if owned else self.negative_ttl)
+        with self._lock:
+            self._entries[key] = (owned, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, thread_id: str, user_id: str | None = None):
+        """Drop cached entries for a thread (for every user if user_id is None)."""
+        with self._lock:
+            if user_id is not None:
+                self._entries.pop((user_id, thread_id), None)
+                return
+            for key in [k for k in self._entries if k[1] == thread_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
@@ -0,0 +1,158 @@
+"""Per-thread serialization of chat turns."""
+
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional
+
+
+class TurnLockTimeout(Exception):
+    """Another turn on the same thread held the lock for longer than the timeout."""
+
+
+class ThreadTurnLocks:
+    """Ensures only one turn runs per chat thread at a time.
+
+    Two concurrent turns on the same thread would both read the same parent
+    checkpoint and one of them would be lost. Turns on different threads
+    never wait for each other.
+
+    In "local" mode a lock map serializes turns within this process. In
+    "postgres" mode each turn additionally takes a session-level advisory
+    lock keyed on the thread id, which serializes turns across workers and
+    machines. The local lock is always taken first, so at most one turn per
+    thread per process holds (or polls for) a database connection. Each
+    running turn holds a connection, so `pool_size` must cover the most
+    turns this process runs at once; waiting for a connection counts
+    against `timeout`.
+    """
+
+    def __init__(
+            self,
+            mode: str = "local",
+            conn_string: Optional[str] = None,
+            pool_size: int = 10,
+            timeout: float = 120
+        ):
+        self.mode = mode
+        self.timeout = timeout
+        self._guard = threading.Lock()
+        self._locks: dict[str, list] = {}  # thread_id -> [lock, users]
+        self._pool = None
+        if mode == "postgres":
+            from psycopg_pool import ConnectionPool
+            # Opened on first use so constructing this opens no connections
+            # (the app is imported before forking workers); connections are
+            # only made for turns that run, not kept idle
+            self._pool = ConnectionPool(
+                conn_string, min_size=0, max_size=pool_size, kwargs={"autocommit": True}, open=False
+            )
+
+        self._stats_lock = threading.Lock()
+        self._waits_ms = deque(maxlen=1000)
+        self.acquired = 0
+        self.contended = 0
+        self.timeouts = 0
+        self.max_wait_ms = 0.0
+
+    @contextmanager
+    def hold(self, thread_id: str):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        with self._guard:
+            entry = self._locks.setdefault(thread_id, [threading.Lock(), 0])
+            entry[1] += 1
+        conn = None
+        try:
+            if not entry[0].acquire(timeout=self.timeout):
+                self._record_timeout()
+                raise TurnLockTimeout(thread_id)
+            try:
+                if self._pool is not None:
+                    conn = self._acquire_advisory(thread_id, deadline)
+                self._record_wait((time.monotonic() - start) * 1000)
+                try:
+                    yield
+                finally:
+                    if conn is not None:
+                        try:
+                            conn.execute("SELECT pg_advisory_unlock(hashtextextended(%s, 0))", (thread_id,))
+                        except BaseException:
+                            # Closing the session is the only sure way to drop its lock;
+                            # the pool discards closed connections
+                            conn.close()
+                            raise
+                        finally:
+                            self._pool.putconn(conn)
+            finally:
+                # Released even if unlocking the advisory lock failed
+                entry[0].release()
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._locks[thread_id]
+
+    def _acquire_advisory(self, thread_id: str, deadline: float):
+        """Poll pg_try_advisory_lock, only keeping a connection once the lock is ours."""
+        from psycopg_pool import PoolTimeout
+        if self._pool.closed:
+            with self._guard:
+                if self._pool.closed:
+                    self._pool.open()
+        delay = 0.05
+        while True:
+            try:
+                conn = self._pool.getconn(timeout=max(deadline - time.monotonic(), 0.001))
+            except PoolTimeout:
+                self._record_timeout()
+                raise TurnLockTimeout(thread_id)
+            try:
+                locked = conn.execute(
+                    "SELECT pg_try_advisory_lock(hashtextextended(%s, 0))", (thread_id,)
+                ).fetchone()[0]
+            except BaseException:
+                self._pool.putconn(conn)
+                raise
+            if locked:
+                return conn
+            self._pool.putconn(conn)
+            if time.monotonic() + delay > deadline:
+                self._record_timeout()
+                raise TurnLockTimeout(thread_id)
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+
+    def _record_wait(self, wait_ms: float):
+        with self._stats_lock:
+            self.acquired += 1
+            if wait_ms >= 1:
+                self.contended += 1
+            self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            self._waits_ms.append(wait_ms)
+
+    def _record_timeout(self):
+        with self._stats_lock:
+            self.timeouts += 1
+
+    def stats(self) -> dict:
+        with self._stats_lock:
+            waits = sorted(self._waits_ms)
+        with self._guard:
+            active = len(self._locks)
+        percentile = lambda p: round(waits[min(int(len(waits) * p), len(waits) - 1)], 2) if waits else 0.0
+        return {
+            "mode": self.mode,
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "timeouts": self.timeouts,
+            "active_threads": active,
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p95": percentile(0.95),
+            "wait_ms_max": round(self.max_wait_ms, 2),
+        }
+
+    def close(self):
+        if self._pool is not None and not self._pool.closed:
+            self._pool.close()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""Standalone worker for chat turns queued with "Prefer: respond-async".
+
+Runs JOB_WORKER_CONCURRENCY threads pulling from the chat_jobs table; start
+as many of these processes as needed. Web processes only enqueue unless
+JOB_WORKERS is set, so at least one worker must run for async turns.
+"""
+
+import os
+import signal
+import sys
+import threading
+from dotenv import load_dotenv
+
+load_dotenv(dotenv_path=".env", override=True)
+
+import api
+
+
+def run_worker():
+    concurrency = int(os.getenv("JOB_WORKER_CONCURRENCY", 4))
+    if concurrency <= 0:
+        print(f"❌ JOB_WORKER_CONCURRENCY must be positive, got {concurrency}")
+        sys.exit(1)
+
+    api.init_db()
+    # Give up eventually so the supervisor restarts the process
+    api.warm_up(max_attempts=int(os.getenv("WORKER_WARMUP_ATTEMPTS", 10)))
+    if not api.warmup_done.is_set():
+        print("❌ Worker warm-up failed")
+        sys.exit(1)
+
+    pool = api.start_job_workers(concurrency)
+    print(f"✅ Processing chat jobs with {concurrency} thread(s)")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    stop.wait()
+
+    print("Stopping chat job worker...")
+    pool.stop(timeout=30)
+
+
+if __name__ == "__main__":
+    run_worker()